@@ -0,0 +1,586 @@
+"""
+Benchmarks for the Rice Pest Expert System
+------------------------------------------
+Subcommands:
+- imports: startup cost (-X importtime) of each module and of the
+  short-lived CLI paths, measured in fresh interpreters
+- pool: CLIPS consultations with a fresh environment each time vs. an
+  EnvironmentPool of warm environments
+- rules: CLIPS rule base load time, text .clp vs. binary image, as the rule
+  file grows
+- parallel: ParallelDiagnosisRunner throughput by worker count
+- latency: p50/p95/p99 consultation latency and throughput of both engines,
+  by number of observed symptoms and rule base size, written to JSON
+- compare: flag regressions of a latency JSON file against a baseline
+
+Run:
+  python rice_pest_benchmark.py imports
+Optional:
+  python rice_pest_benchmark.py imports --repeat 10
+  python rice_pest_benchmark.py pool --consultations 200
+  python rice_pest_benchmark.py rules --sizes 0 1000 5000
+  python rice_pest_benchmark.py parallel --workers 1 2 4 8 --cases 20000
+  python rice_pest_benchmark.py latency --rules 15 1000 10000 --out latency.json
+  python rice_pest_benchmark.py compare baseline.json latency.json --threshold 0.15
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from statistics import quantiles
+
+from rice_pest_multi_agent_eval import print_table
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Symptom sets (CLIPS names) cycled through by the consultation benchmarks.
+CONSULTATIONS = (
+    {"hopper-burn": 0.9, "yellowing-drying": 0.8, "circular-patches": 0.85},
+    {"dead-heart": 0.9, "central-shoot-withered": 0.8, "stem-bore-holes": 0.7},
+    {"folded-leaves": 0.8, "leaf-scraping": 0.75, "whitish-streaks": 0.9},
+    {"silver-shoot": 0.9, "onion-leaf-gall": 0.9},
+)
+
+IMPORT_MODULES = (
+    "rice_pest_expert_standalone",
+    "rice_pest_expert",
+    "rice_pest_multi_agent_eval",
+    "clips",
+)
+
+
+def run_python(args: list[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=HERE,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+    )
+
+
+# -------------------------
+# imports
+# -------------------------
+def import_time_ms(module: str, repeat: int = 5) -> tuple[float, float] | None:
+    """Best (self, cumulative) import time of module in ms, via -X importtime
+
+    Returns None if the module cannot be imported here.
+    """
+    best = None
+    for _ in range(repeat):
+        proc = run_python(["-X", "importtime", "-c", f"import {module}"])
+        if proc.returncode != 0:
+            return None
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                self_us = int(parts[0].rsplit(":", 1)[1])
+                cumulative_us = int(parts[1])
+                if best is None or cumulative_us < best[1]:
+                    best = (self_us, cumulative_us)
+    return None if best is None else (best[0] / 1000.0, best[1] / 1000.0)
+
+
+def command_time_ms(args: list[str], repeat: int = 5) -> float | None:
+    """Best wall-clock time in ms of `python <args>` in a fresh interpreter"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = run_python(args)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        if proc.returncode != 0:
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+STARTUP_COMMANDS = (
+    ("interpreter only", ["-c", "pass"]),
+    ("rice_pest_expert.py --list-symptoms", ["rice_pest_expert.py", "--list-symptoms"]),
+    (
+        "CLIPS session, first env",
+        ["-c", "import rice_pest_expert as m; m.RicePestExpertSystem().env"],
+    ),
+)
+
+
+def bench_imports(repeat: int):
+    rows = []
+    for module in IMPORT_MODULES:
+        result = import_time_ms(module, repeat)
+        if result is None:
+            rows.append([module, "n/a", "n/a"])
+        else:
+            rows.append([module, f"{result[0]:.1f}", f"{result[1]:.1f}"])
+    print("\n=== IMPORT TIME (python -X importtime, best of %d) ===" % repeat)
+    print_table(["Module", "Self ms", "Cumulative ms"], rows)
+
+    rows = []
+    for label, args in STARTUP_COMMANDS:
+        elapsed = command_time_ms(args, repeat)
+        rows.append([label, "n/a" if elapsed is None else f"{elapsed:.1f}"])
+    print("\n=== STARTUP WALL TIME (fresh interpreter, best of %d) ===" % repeat)
+    print_table(["Command", "Wall ms"], rows)
+
+
+@contextmanager
+def quiet_stdout():
+    """Silence fd 1, which CLIPS printout writes to directly"""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+
+# -------------------------
+# pool
+# -------------------------
+def bench_pool(consultations: int):
+    from rice_pest_expert import EnvironmentPool, RicePestExpertSystem
+
+    knowledge_base = RicePestExpertSystem().knowledge_base
+    cases = [CONSULTATIONS[i % len(CONSULTATIONS)] for i in range(consultations)]
+
+    with quiet_stdout():
+        start = time.perf_counter()
+        for case in cases:
+            RicePestExpertSystem(knowledge_base).diagnose(case)
+        fresh = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pool = EnvironmentPool(min_size=2, max_size=4)
+        warmup = time.perf_counter() - start
+        session = RicePestExpertSystem(knowledge_base, pool=pool)
+        start = time.perf_counter()
+        for case in cases:
+            session.diagnose(case)
+        pooled = time.perf_counter() - start
+
+    rows = [
+        ["fresh environment", "-", f"{fresh / consultations * 1000:.3f}", f"{consultations / fresh:.0f}"],
+        ["EnvironmentPool", f"{warmup * 1000:.1f}", f"{pooled / consultations * 1000:.3f}", f"{consultations / pooled:.0f}"],
+    ]
+    print("\n=== CLIPS CONSULTATIONS (%d) ===" % consultations)
+    print_table(["Mode", "Startup ms", "ms/consultation", "Consultations/s"], rows)
+
+
+# -------------------------
+# rules
+# -------------------------
+def synthetic_rules(count: int) -> str:
+    """count extra identify rules in the style of rice_pest_rules.clp
+
+    Like the shipped rules they assert pest-evidence facts, see clips_rule.
+    """
+    rules = []
+    for i in range(count):
+        record = {
+            "rule_id": f"SYN{i}",
+            "pest_name": f"Synthetic Pest {i % 50}",
+            "required_symptoms": [f"synthetic_symptom_{(i * 7 + k) % 300}" for k in range(3)],
+            "rule_cf": 0.8,
+        }
+        rules.append(clips_rule(record, {record["pest_name"]: f"Synthetica {i % 50}"}))
+    return "\n".join(rules)
+
+
+def best_ms(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000.0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_rules(sizes: list[int], repeat: int):
+    import clips
+
+    from rice_pest_expert import RULES_FILE, build_rule_image, load_rule_base
+
+    with open(RULES_FILE, encoding="utf-8") as f:
+        base_rules = f.read()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        rules_file = os.path.join(tmp, "rice_pest_rules.clp")
+        for extra in sizes:
+            with open(rules_file, "w", encoding="utf-8") as f:
+                f.write(base_rules + "\n" + synthetic_rules(extra))
+
+            text_ms = best_ms(lambda: clips.Environment().load(rules_file), repeat)
+            image_path = build_rule_image(rules_file)
+            image_ms = best_ms(
+                lambda: load_rule_base(clips.Environment(), rules_file), repeat
+            )
+            rows.append(
+                [
+                    extra,
+                    f"{os.path.getsize(rules_file) / 1024:.0f}",
+                    f"{os.path.getsize(image_path) / 1024:.0f}",
+                    f"{text_ms:.2f}",
+                    f"{image_ms:.2f}",
+                    f"{text_ms / image_ms:.1f}x",
+                ]
+            )
+
+    print("\n=== CLIPS RULE BASE LOAD (new env + load, best of %d) ===" % repeat)
+    print_table(
+        ["Extra rules", ".clp KiB", "Image KiB", "Text ms", "Image ms", "Speedup"],
+        rows,
+    )
+    print("Image ms includes the freshness check (hash of the .clp text).")
+
+
+# -------------------------
+# parallel
+# -------------------------
+def random_observations(count: int, seed: int = 0):
+    """count random {symptom: cf} observations of 1-6 knowledge base symptoms"""
+    import random
+
+    from rice_pest_expert_standalone import load_knowledge_base
+
+    names = list(load_knowledge_base().symptoms)
+    rng = random.Random(seed)
+    return [
+        {s: round(rng.uniform(0.1, 1.0), 2) for s in rng.sample(names, rng.randint(1, 6))}
+        for _ in range(count)
+    ]
+
+
+def bench_parallel(worker_counts: list[int], cases: int, chunk_size: int):
+    from rice_pest_parallel import ParallelDiagnosisRunner
+
+    observations = random_observations(cases)
+    rows = []
+    base = None
+    for workers in worker_counts:
+        with ParallelDiagnosisRunner(workers, chunk_size) as runner:
+            for _ in runner.imap(observations):
+                pass
+        base = base or runner.throughput
+        rows.append(
+            [
+                workers,
+                f"{runner.elapsed:.2f}",
+                f"{runner.throughput:.0f}",
+                f"{runner.throughput / base:.2f}x",
+            ]
+        )
+    print(
+        "\n=== PARALLEL CLIPS DIAGNOSIS (%d cases, chunk %d, %d CPUs) ==="
+        % (cases, chunk_size, os.cpu_count() or 1)
+    )
+    print_table(["Workers", "Seconds", "Cases/s", "Speedup"], rows)
+
+
+# -------------------------
+# latency
+# -------------------------
+LATENCY_METRICS = ("p50_us", "p95_us", "p99_us", "throughput")
+
+
+def inflated_knowledge(total_rules: int, seed: int = 0) -> dict:
+    """Knowledge base records with synthetic rules added up to total_rules
+
+    The extra rules require 2-3 of the real symptoms and conclude a real
+    pest, so they match and fire like the shipped ones do.
+    """
+    import random
+
+    from rice_pest_expert_standalone import DEFAULT_KNOWLEDGE_FILE, read_knowledge_source
+
+    data = read_knowledge_source(DEFAULT_KNOWLEDGE_FILE)
+    symptoms = [rec["name"] for rec in data["symptoms"]]
+    pests = [rec["name"] for rec in data["pests"]]
+    rng = random.Random(seed)
+    for i in range(total_rules - len(data["rules"])):
+        data["rules"].append(
+            {
+                "rule_id": f"S{i + 1}",
+                "pest_name": rng.choice(pests),
+                "required_symptoms": rng.sample(symptoms, rng.randint(2, 3)),
+                "rule_cf": round(rng.uniform(0.5, 0.95), 2),
+            }
+        )
+    return data
+
+
+def clips_rule(rule: dict, scientific_names: dict) -> str:
+    """One knowledge base rule record as a rice_pest_rules.clp identify rule"""
+    from rice_pest_expert import clips_symptom_name
+
+    names = [clips_symptom_name(s) for s in rule["required_symptoms"]]
+    patterns = "\n".join(
+        f"   (symptom (name {name}) (present yes) (cf ?cf{k}))"
+        for k, name in enumerate(names, 1)
+    )
+    cfs = " ".join(f"?cf{k}" for k in range(1, len(names) + 1))
+    pest = rule["pest_name"]
+    return (
+        f"(defrule identify-{rule['rule_id'].lower()}\n{patterns}\n   =>\n"
+        f"   (bind ?rule-cf (* (/ (+ {cfs}) {len(names)}) {rule['rule_cf']}))\n"
+        f'   (assert (pest-evidence (rule {rule["rule_id"]}) (pest-name "{pest}")\n'
+        f'                          (scientific-name "{scientific_names[pest]}") '
+        f"(cf ?rule-cf))))\n"
+    )
+
+
+def latency_stats(samples: list[float]) -> dict:
+    """p50/p95/p99 in microseconds and consultations per second of samples (s)"""
+    cuts = quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50_us": cuts[49] * 1e6,
+        "p95_us": cuts[94] * 1e6,
+        "p99_us": cuts[98] * 1e6,
+        "throughput": len(samples) / sum(samples),
+    }
+
+
+def time_standalone(kb, observations: list[dict]) -> list[float]:
+    """Per-consultation seconds of reset / set_symptom / forward_chain"""
+    from rice_pest_expert_standalone import RicePestExpertSystem
+
+    session = RicePestExpertSystem(kb)
+    clock = time.perf_counter
+    samples = []
+    for observation in observations:
+        start = clock()
+        session.reset()
+        for name, cf in observation.items():
+            session.set_symptom(name, True, cf)
+        session.forward_chain()
+        samples.append(clock() - start)
+    return samples
+
+
+def time_clips(session, observations: list[dict]) -> list[float]:
+    """Per-consultation seconds of the CLIPS path
+
+    reset_system / assert_symptom / run_inference / get_identified_pests,
+    inside consultation() so the pool rotates worn-out environments as in
+    production instead of one environment slowing down over the run.
+    """
+    from rice_pest_expert import clips_symptom_name
+
+    cases = [
+        [(clips_symptom_name(name), cf) for name, cf in observation.items()]
+        for observation in observations
+    ]
+    clock = time.perf_counter
+    samples = []
+    for case in cases:
+        start = clock()
+        with session.consultation():
+            for name, cf in case:
+                session.assert_symptom(name, True, cf)
+            session.run_inference()
+            session.get_identified_pests()
+        samples.append(clock() - start)
+    return samples
+
+
+def bench_latency(
+    rule_counts: list[int],
+    symptom_counts: list[int] | None,
+    iterations: int,
+    engines: list[str],
+    seed: int,
+) -> dict:
+    import random
+
+    from rice_pest_expert_standalone import (
+        DEFAULT_KNOWLEDGE_FILE,
+        KnowledgeBase,
+        read_knowledge_source,
+    )
+
+    shipped_rules = len(read_knowledge_source(DEFAULT_KNOWLEDGE_FILE)["rules"])
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for total_rules in rule_counts:
+            data = inflated_knowledge(total_rules, seed)
+            kb = KnowledgeBase(data)
+            names = list(kb.symptoms)
+            counts = symptom_counts or range(1, len(names) + 1)
+
+            if "clips" in engines:
+                from rice_pest_expert import (
+                    RULES_FILE,
+                    EnvironmentPool,
+                    RicePestExpertSystem,
+                    build_rule_image,
+                )
+
+                rules_file = os.path.join(tmp, f"rules_{total_rules}.clp")
+                scientific_names = {p.name: p.scientific_name for p in kb.pests.values()}
+                with open(RULES_FILE, encoding="utf-8") as f:
+                    text = f.read()
+                extra = [clips_rule(rec, scientific_names) for rec in data["rules"][shipped_rules:]]
+                with open(rules_file, "w", encoding="utf-8") as f:
+                    f.write(text + "\n" + "\n".join(extra))
+                build_rule_image(rules_file)
+
+            for count in counts:
+                rng = random.Random(f"{seed}-{total_rules}-{count}")
+                observations = [
+                    {s: round(rng.uniform(0.1, 1.0), 2) for s in rng.sample(names, count)}
+                    for _ in range(iterations)
+                ]
+                for engine in engines:
+                    if engine == "standalone":
+                        samples = time_standalone(kb, observations)
+                    else:
+                        # A fresh environment per case: an environment slows
+                        # down until the pool rotates it, and every case
+                        # should start from the same point of that cycle.
+                        pool = EnvironmentPool(min_size=1, max_size=1, rules_file=rules_file)
+                        session = RicePestExpertSystem(kb, pool=pool, quiet=True)
+                        samples = time_clips(session, observations)
+                    row = {"engine": engine, "rules": len(kb.rules), "symptoms": count}
+                    row.update(latency_stats(samples))
+                    results.append(row)
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "iterations": iterations,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def print_latency(report: dict):
+    rows = [
+        [
+            r["engine"],
+            r["rules"],
+            r["symptoms"],
+            f"{r['p50_us']:.1f}",
+            f"{r['p95_us']:.1f}",
+            f"{r['p99_us']:.1f}",
+            f"{r['throughput']:.0f}",
+        ]
+        for r in report["results"]
+    ]
+    print(
+        "\n=== CONSULTATION LATENCY (%d consultations per row) ==="
+        % report["meta"]["iterations"]
+    )
+    print_table(
+        ["Engine", "Rules", "Symptoms", "p50 us", "p95 us", "p99 us", "Consultations/s"],
+        rows,
+    )
+
+
+# -------------------------
+# compare
+# -------------------------
+def compare_latency(baseline: dict, current: dict, threshold: float) -> list[list]:
+    """Rows where current is more than threshold (a fraction) worse than baseline
+
+    Latency percentiles regress when they grow, throughput when it drops.
+    Cases missing from either file are skipped.
+    """
+    def key(r):
+        return r["engine"], r["rules"], r["symptoms"]
+
+    base = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        old = base.get(key(r))
+        if old is None:
+            continue
+        for metric in LATENCY_METRICS:
+            change = r[metric] / old[metric] - 1.0
+            slowdown = -change if metric == "throughput" else change
+            if slowdown > threshold:
+                regressions.append(
+                    [*key(r), metric, f"{old[metric]:.1f}", f"{r[metric]:.1f}", f"{change:+.0%}"]
+                )
+    return regressions
+
+
+def load_report(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_imports = sub.add_parser("imports", help="Module import and CLI startup cost.")
+    p_imports.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is kept).")
+    p_pool = sub.add_parser("pool", help="Fresh CLIPS environment vs. EnvironmentPool.")
+    p_pool.add_argument("--consultations", type=int, default=200, help="Consultations per mode.")
+    p_rules = sub.add_parser("rules", help="Text .clp vs. binary image load time.")
+    p_rules.add_argument("--sizes", type=int, nargs="+", default=[0, 250, 1000, 4000], help="Extra synthetic rules per run.")
+    p_rules.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is kept).")
+    p_parallel = sub.add_parser("parallel", help="ParallelDiagnosisRunner scaling.")
+    p_parallel.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare.")
+    p_parallel.add_argument("--cases", type=int, default=20000, help="Observations per run.")
+    p_parallel.add_argument("--chunk-size", type=int, default=64, help="Observations per task.")
+    p_latency = sub.add_parser("latency", help="Consultation latency percentiles of both engines.")
+    p_latency.add_argument("--rules", type=int, nargs="+", default=[15, 1000, 10000], help="Rule base sizes (the shipped 15 rules plus synthetic ones).")
+    p_latency.add_argument("--symptoms", type=int, nargs="+", default=None, help="Observed symptom counts (default: 1 to all).")
+    p_latency.add_argument("--iterations", type=int, default=200, help="Consultations per (engine, rules, symptoms) case.")
+    p_latency.add_argument("--engines", nargs="+", choices=["standalone", "clips"], default=["standalone", "clips"], help="Engines to measure.")
+    p_latency.add_argument("--seed", type=int, default=0, help="Seed for the synthetic rules and observations.")
+    p_latency.add_argument("--out", type=str, default="latency.json", help="JSON results file.")
+    p_compare = sub.add_parser("compare", help="Flag regressions against a baseline latency JSON file.")
+    p_compare.add_argument("baseline", help="Baseline JSON file from the latency command.")
+    p_compare.add_argument("current", help="JSON file to check.")
+    p_compare.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown as a fraction (0.10 = 10%%).")
+    args = parser.parse_args()
+
+    if args.command == "imports":
+        bench_imports(args.repeat)
+    elif args.command == "pool":
+        bench_pool(args.consultations)
+    elif args.command == "rules":
+        bench_rules(args.sizes, args.repeat)
+    elif args.command == "parallel":
+        bench_parallel(args.workers, args.cases, args.chunk_size)
+    elif args.command == "latency":
+        if args.iterations < 2:
+            parser.error("--iterations must be at least 2 to compute percentiles")
+        report = bench_latency(args.rules, args.symptoms, args.iterations, args.engines, args.seed)
+        print_latency(report)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to: {args.out}")
+    elif args.command == "compare":
+        regressions = compare_latency(load_report(args.baseline), load_report(args.current), args.threshold)
+        if not regressions:
+            print(f"No regressions beyond {args.threshold:.0%}.")
+            return
+        print("\n=== REGRESSIONS (> %.0f%% worse than baseline) ===" % (args.threshold * 100))
+        print_table(["Engine", "Rules", "Symptoms", "Metric", "Baseline", "Current", "Change"], regressions)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,250 +6,491 @@ Using Python with CLIPSpy for Forward Chaining Inference
 Author: Expert System Project - TES6313
 """
 
-import clips
+import argparse
+import hashlib
 import os
 import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from rice_pest_expert_standalone import load_knowledge_base
+
+RULES_FILE = os.path.join(os.path.dirname(__file__), "rice_pest_rules.clp")
+# A CLIPS environment slows down and grows a little with every reset that
+# follows an assert, so long-running sessions and pools swap in a fresh one
+# (a cheap binary image load) after this many consultations.
+ENV_MAX_USES = 2000
+# Seconds EnvironmentPool.acquire() waits for a free environment by default.
+POOL_ACQUIRE_TIMEOUT = 60.0
+
+
+def clips_symptom_name(name):
+    """Knowledge base symptom name (hopper_burn) to CLIPS symbol (hopper-burn)"""
+    return name.replace("_", "-")
+
+
+def _clips():
+    """Import clipspy on first use
+
+    Listing symptoms or validating input never touches CLIPS, so the
+    binding is only loaded once an environment is actually needed.
+    """
+    import clips
+
+    return clips
+
+
+def rule_image_path(rules_file=RULES_FILE):
+    """Path of the binary image build_rule_image() writes for rules_file
+
+    The name carries a digest of the rule text and the clipspy version, so
+    an edited .clp file or an upgraded CLIPS never matches an old image.
+    """
+    digest = hashlib.sha256(_clips().__version__.encode())
+    with open(rules_file, "rb") as f:
+        digest.update(f.read())
+    stem = os.path.basename(rules_file)
+    image_dir = os.path.join(
+        os.path.dirname(os.path.abspath(rules_file)), "__pycache__"
+    )
+    return os.path.join(image_dir, f"{stem}.{digest.hexdigest()[:20]}.bin")
+
+
+def build_rule_image(rules_file=RULES_FILE):
+    """Parse rules_file once and bsave it as a binary image; returns its path
+
+    Older images of the same rule file are removed.
+    """
+    env = _clips().Environment()
+    env.load(rules_file)
+    # Slot constraints are only written to the image with dynamic checking on;
+    # without them a bloaded environment would accept out-of-range facts.
+    env.eval("(set-dynamic-constraint-checking TRUE)")
+
+    image_path = rule_image_path(rules_file)
+    image_dir = os.path.dirname(image_path)
+    os.makedirs(image_dir, exist_ok=True)
+    tmp_path = f"{image_path}.{os.getpid()}.tmp"
+    env.save(tmp_path, binary=True)
+    os.replace(tmp_path, image_path)
+    stem = os.path.basename(rules_file)
+    for name in os.listdir(image_dir):
+        if name.startswith(f"{stem}.") and name.endswith(".bin"):
+            if os.path.join(image_dir, name) != image_path:
+                os.remove(os.path.join(image_dir, name))
+    return image_path
+
+
+def load_rule_base(env, rules_file=RULES_FILE):
+    """Load the CLIPS rules into env, from the binary image when it is fresh
+
+    An image matching the current rule text (see build_rule_image) is
+    bloaded; a missing, stale or unreadable one falls back to parsing
+    the .clp text.
+    """
+    if not os.path.exists(rules_file):
+        print(f"Warning: Rules file not found at {rules_file}")
+        print("Creating rules from embedded knowledge base...")
+        _create_embedded_rules(env)
+        return
+
+    image_path = rule_image_path(rules_file)
+    if os.path.exists(image_path):
+        try:
+            env.load(image_path, binary=True)
+            return
+        except _clips().CLIPSError:
+            env.clear()  # incompatible image: parse the text below
+    env.load(rules_file)
+
+
+def _create_embedded_rules(env):
+    """Create rules directly if CLP file not found"""
+    env.build("""
+    (deftemplate symptom
+       (slot name (type SYMBOL))
+       (slot present (type SYMBOL) (allowed-symbols yes no unknown) (default unknown))
+       (slot cf (type FLOAT) (range 0.0 1.0) (default 0.0)))
+    """)
+
+    env.build("""
+    (deftemplate pest
+       (slot name (type STRING))
+       (slot scientific-name (type STRING))
+       (slot cf (type FLOAT) (range 0.0 1.0) (default 0.0))
+       (slot identified (type SYMBOL) (allowed-symbols yes no) (default no)))
+    """)
+
+
+def new_environment(rules_file=RULES_FILE):
+    """Create a CLIPS environment with the rule base loaded"""
+    env = _clips().Environment()
+    load_rule_base(env, rules_file)
+    return env
+
+
+class EnvironmentPool:
+    """Warm CLIPS environments with the rule base already loaded
+
+    Construction and rule parsing happen here, up front, instead of once per
+    consultation. acquire() hands out an idle environment (creating one if
+    fewer than max_size exist, otherwise waiting for a release) and
+    release() resets it and puts it back. Environments left idle for longer
+    than idle_timeout seconds are dropped, down to min_size. An environment
+    that has served max_uses consultations is replaced by a fresh one on
+    release, see ENV_MAX_USES. Every environment loads rules_file. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        min_size=1,
+        max_size=4,
+        idle_timeout=300.0,
+        max_uses=None,
+        rules_file=RULES_FILE,
+    ):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(
+                f"Need 0 <= min_size <= max_size and max_size >= 1, "
+                f"got min_size={min_size}, max_size={max_size}"
+            )
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_uses = max_uses or ENV_MAX_USES
+        self.rules_file = rules_file
+        self._uses = {}  # id(env) -> consultations served
+        self._idle = []  # [(env, released_at)], most recently used last
+        self._size = 0  # idle + checked out
+        self._lock = threading.Condition()
+        now = time.monotonic()
+        for _ in range(min_size):
+            self._idle.append((new_environment(rules_file), now))
+            self._size += 1
+
+    @property
+    def size(self):
+        """Number of live environments, idle or checked out"""
+        return self._size
+
+    @property
+    def idle(self):
+        """Number of environments waiting in the pool"""
+        return len(self._idle)
+
+    def acquire(self, timeout=POOL_ACQUIRE_TIMEOUT):
+        """Check out a reset environment, waiting up to timeout seconds if full
+
+        timeout=None waits for as long as it takes.
+        """
+        with self._lock:
+            self._evict_idle()
+            if not self._lock.wait_for(
+                lambda: self._idle or self._size < self.max_size, timeout
+            ):
+                raise TimeoutError(
+                    f"No CLIPS environment free after {timeout}s "
+                    f"(max_size={self.max_size})"
+                )
+            if self._idle:
+                return self._idle.pop()[0]
+            self._size += 1
+        try:
+            return new_environment(self.rules_file)
+        except BaseException:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, env, uses=1):
+        """Reset env and return it to the pool, or a fresh one if env is worn out
+
+        uses is the number of consultations env served while checked out.
+        """
+        with self._lock:
+            uses += self._uses.pop(id(env), 0)
+        if uses >= self.max_uses:
+            env, uses = new_environment(self.rules_file), 0
+        else:
+            env.reset()
+        with self._lock:
+            self._uses[id(env)] = uses
+            self._idle.append((env, time.monotonic()))
+            self._evict_idle()
+            self._lock.notify()
+
+    @contextmanager
+    def environment(self, timeout=POOL_ACQUIRE_TIMEOUT):
+        """Check out an environment for the duration of a with block"""
+        env = self.acquire(timeout)
+        try:
+            yield env
+        finally:
+            self.release(env)
+
+    def _evict_idle(self):
+        """Drop environments idle past idle_timeout, oldest first (lock held)"""
+        cutoff = time.monotonic() - self.idle_timeout
+        while (
+            self._idle
+            and self._size > self.min_size
+            and self._idle[0][1] < cutoff
+        ):
+            env = self._idle.pop(0)[0]
+            self._uses.pop(id(env), None)
+            self._size -= 1
+
+
+class _Checkout:
+    """The CLIPS environment one thread of a session works on
+
+    uses counts its resets. A pooled checkout is tied to owner, the thread's
+    state in the session: if the owner is garbage collected first (the thread
+    exited or the session was dropped), the environment still goes back to
+    the pool instead of being lost to it for good.
+    """
+
+    def __init__(self, env, pool=None, owner=None):
+        self.env = env
+        self.uses = 0
+        self.pool = pool
+        if pool is not None:
+            self._finalizer = weakref.finalize(owner, self.release)
+            self._finalizer.atexit = False
+
+    def release(self):
+        """Give a pooled environment back to its pool (once)"""
+        if self.pool is not None:
+            self._finalizer.detach()
+            env, self.env = self.env, None
+            if env is not None:
+                self.pool.release(env, uses=self.uses)
+
+
+class _ThreadState:
+    """A session's state for one thread, referenced only by its threading.local"""
+
+    def __init__(self):
+        self.checkout = None  # _Checkout, or None before first use
 
 
 class RicePestExpertSystem:
     """Expert System for Rice Pest Identification and Control Recommendations"""
 
-    def __init__(self):
-        self.env = clips.Environment()
+    def __init__(self, knowledge_base=None, pool=None, quiet=False):
+        if knowledge_base is None:
+            knowledge_base = load_knowledge_base()
+        self.knowledge_base = knowledge_base
         self.symptoms_db = self._initialize_symptoms_database()
         self.pests_info = self._initialize_pests_info()
-        self._load_rules()
+        self.pool = pool  # EnvironmentPool to draw from, or None for a private env
+        self.quiet = quiet  # batch mode: the display rules never fire
+        # Each thread gets its own environment (CLIPS environments are not
+        # thread-safe): .state is the thread's _ThreadState, see env
+        self._local = threading.local()
+
+    @property
+    def env(self):
+        """The calling thread's CLIPS environment, obtained on first use
+
+        Every thread works on its own environment, so one session can be
+        shared by several threads. With a pool the environment stays checked
+        out until release_environment(); consultation() does this per
+        diagnosis. One still checked out when its thread exits or the session
+        is dropped goes back to the pool then.
+        """
+        state = self._thread_state()
+        if state.checkout is None:
+            if self.pool is not None:
+                state.checkout = _Checkout(self.pool.acquire(), self.pool, state)
+            else:
+                state.checkout = _Checkout(new_environment())
+            self._apply_output_mode()
+        return state.checkout.env
+
+    def _thread_state(self):
+        """The calling thread's _ThreadState, created on first use"""
+        state = getattr(self._local, "state", None)
+        if state is None:
+            state = self._local.state = _ThreadState()
+        return state
+
+    def _apply_output_mode(self):
+        """Switch the display rules off for a quiet session
+
+        reset restores ?*display-output* to TRUE, so this runs after every
+        reset. Pooled environments are shared with verbose sessions.
+        """
+        if self.quiet:
+            try:
+                self.env.find_global("display-output").value = False
+            except LookupError:
+                pass  # embedded fallback rules have no display rules
+
+    def release_environment(self):
+        """Return this thread's pooled environment (no-op without a pool)"""
+        state = self._thread_state()
+        if self.pool is not None and state.checkout is not None:
+            checkout, state.checkout = state.checkout, None
+            checkout.release()
+
+    @contextmanager
+    def consultation(self):
+        """One diagnosis on a freshly reset environment
+
+        Pooled sessions check an environment out for the with block and hand
+        it back afterwards, so many sessions can share a few warm
+        environments.
+        """
+        self.reset_system()
+        try:
+            yield self
+        finally:
+            self.release_environment()
+
+    def diagnose(self, symptom_cfs):
+        """Run one consultation for {symptom_name: cf}; returns get_diagnosis()"""
+        with self.consultation():
+            self.assert_symptoms(symptom_cfs)
+            self.run_inference()
+            return self.get_diagnosis()
+
+    @property
+    def recommendation_index(self):
+        """pest_name -> read-only {control_type: (rec, ...)} view"""
+        return self.knowledge_base.recommendation_index
 
     def _initialize_symptoms_database(self):
-        """Initialize the symptom database with descriptions"""
+        """Initialize the symptom database with descriptions
+
+        Symptoms come from the shared knowledge base file; CLIPS symbols
+        use hyphens where the knowledge base uses underscores.
+        """
         return {
-            # Brown Planthopper symptoms
-            "hopper-burn": {
-                "description": "Plants appear burnt/scorched in circular patches (hopper burn)",
-                "pest_hint": "Brown Planthopper",
-            },
-            "yellowing-drying": {
-                "description": "Yellowing and drying of plants from bottom upwards",
-                "pest_hint": "Brown Planthopper",
-            },
-            "circular-patches": {
-                "description": "Circular patches of dead/dying plants in the field",
-                "pest_hint": "Brown Planthopper",
-            },
-            "honeydew-sooty-mold": {
-                "description": "Honeydew secretion with black sooty mold on plants",
-                "pest_hint": "Brown Planthopper",
-            },
-            "plant-base-insects": {
-                "description": "Small brown insects visible at the base of plants",
-                "pest_hint": "Brown Planthopper",
-            },
-            # Yellow Stem Borer symptoms
-            "dead-heart": {
-                "description": "Central shoot/tiller dies and turns brown (dead heart) - vegetative stage",
-                "pest_hint": "Yellow Stem Borer",
-            },
-            "central-shoot-withered": {
-                "description": "Central leaf whorl unfolds incompletely and withers",
-                "pest_hint": "Yellow Stem Borer",
-            },
-            "stem-bore-holes": {
-                "description": "Visible bore holes at the stem base with frass",
-                "pest_hint": "Yellow Stem Borer",
-            },
-            "white-head": {
-                "description": "White/empty panicles that can be easily pulled out (white head) - reproductive stage",
-                "pest_hint": "Yellow Stem Borer",
-            },
-            "empty-panicles": {
-                "description": "Panicles are chaffy/empty with no grain filling",
-                "pest_hint": "Yellow Stem Borer",
-            },
-            "egg-mass-on-leaves": {
-                "description": "Yellowish-brown hairy egg masses on leaf blades",
-                "pest_hint": "Yellow Stem Borer",
-            },
-            "larval-feeding-marks": {
-                "description": "Larvae feeding marks on leaf sheath before boring",
-                "pest_hint": "Yellow Stem Borer",
-            },
-            # Rice Leaf Folder symptoms
-            "folded-leaves": {
-                "description": "Leaves are folded longitudinally with silk threads",
-                "pest_hint": "Rice Leaf Folder",
-            },
-            "leaf-scraping": {
-                "description": "Scraping damage on leaf surface (green tissue removed)",
-                "pest_hint": "Rice Leaf Folder",
-            },
-            "whitish-streaks": {
-                "description": "Whitish/transparent streaks on damaged leaves",
-                "pest_hint": "Rice Leaf Folder",
-            },
-            "tubular-folded-leaf": {
-                "description": "Leaf rolled into a tubular structure",
-                "pest_hint": "Rice Leaf Folder",
-            },
-            "larvae-inside-leaf": {
-                "description": "Green caterpillar/larvae found inside folded leaves",
-                "pest_hint": "Rice Leaf Folder",
-            },
-            # Rice Gall Midge symptoms
-            "silver-shoot": {
-                "description": "Silver-white hollow tillers (silver shoot/onion shoot)",
-                "pest_hint": "Rice Gall Midge",
-            },
-            "onion-leaf-gall": {
-                "description": "Gall formation with onion leaf-like appearance",
-                "pest_hint": "Rice Gall Midge",
-            },
-            "stunted-tillers": {
-                "description": "Stunted growth of affected tillers",
-                "pest_hint": "Rice Gall Midge",
-            },
-            "no-panicle-emergence": {
-                "description": "Affected tillers fail to produce panicles",
-                "pest_hint": "Rice Gall Midge",
-            },
-            "elongated-leaf-sheath": {
-                "description": "Elongated and pale green leaf sheath",
-                "pest_hint": "Rice Gall Midge",
-            },
-            # Rice Bug symptoms
-            "foul-smell": {
-                "description": "Strong foul/unpleasant smell in the field",
-                "pest_hint": "Rice Bug",
-            },
-            "empty-grains": {
-                "description": "Empty or partially filled grains at maturity",
-                "pest_hint": "Rice Bug",
-            },
-            "discolored-grains": {
-                "description": "Discolored spots on grains (feeding marks)",
-                "pest_hint": "Rice Bug",
-            },
+            clips_symptom_name(sym.name): {
+                "description": sym.description,
+                "pest_hint": sym.pest_hint,
+            }
+            for sym in self.knowledge_base.symptoms.values()
         }
 
     def _initialize_pests_info(self):
-        """Initialize pest information database"""
+        """Initialize pest information database from the shared knowledge base"""
         return {
-            "Brown Planthopper": {
-                "scientific_name": "Nilaparvata lugens",
-                "description": "Small brown sucking insect that feeds on plant sap at the base of rice plants",
-                "damage_type": "Causes hopper burn - plants dry up and appear scorched",
-                "favorable_conditions": "High humidity, excessive nitrogen use, continuous flooding",
-                "affected_stage": "All growth stages, especially tillering to heading",
-            },
-            "Yellow Stem Borer": {
-                "scientific_name": "Scirpophaga incertulas",
-                "description": "Larvae bore into rice stems causing dead hearts and white heads",
-                "damage_type": "Dead heart in vegetative stage, White head in reproductive stage",
-                "favorable_conditions": "Staggered planting, presence of stubbles, high nitrogen",
-                "affected_stage": "Tillering (dead heart) and heading (white head) stages",
-            },
-            "Rice Leaf Folder": {
-                "scientific_name": "Cnaphalocrocis medinalis",
-                "description": "Caterpillar folds leaves and feeds on green tissue inside",
-                "damage_type": "Reduces photosynthetic area, whitish streaks on leaves",
-                "favorable_conditions": "High humidity, shaded/dense canopy, excessive nitrogen",
-                "affected_stage": "Vegetative to reproductive stages",
-            },
-            "Rice Gall Midge": {
-                "scientific_name": "Orseolia oryzae",
-                "description": "Maggot causes gall formation producing silver shoots",
-                "damage_type": "Silver shoot/onion leaf - tillers become tubular and fail to produce panicles",
-                "favorable_conditions": "Cloudy weather, high humidity, late planting",
-                "affected_stage": "Seedling to tillering stages",
-            },
-            "Rice Bug": {
-                "scientific_name": "Leptocorisa oratorius",
-                "description": "Slender green/brown bug that sucks sap from developing grains",
-                "damage_type": "Empty/partially filled grains, reduced grain quality",
-                "favorable_conditions": "Weedy fields, staggered harvesting, presence of wild grasses",
-                "affected_stage": "Flowering to grain filling stages",
-            },
+            pest.name: {
+                "scientific_name": pest.scientific_name,
+                "description": pest.description,
+                "damage_type": pest.damage_type,
+                "favorable_conditions": pest.favorable_conditions,
+                "affected_stage": pest.affected_stage,
+            }
+            for pest in self.knowledge_base.pests.values()
         }
 
-    def _load_rules(self):
-        """Load CLIPS rules from file"""
-        rules_file = os.path.join(os.path.dirname(__file__), "rice_pest_rules.clp")
-        if os.path.exists(rules_file):
-            self.env.load(rules_file)
-        else:
-            print(f"Warning: Rules file not found at {rules_file}")
-            print("Creating rules from embedded knowledge base...")
-            self._create_embedded_rules()
-
-    def _create_embedded_rules(self):
-        """Create rules directly if CLP file not found"""
-        self.env.build("""
-        (deftemplate symptom
-           (slot name (type SYMBOL))
-           (slot present (type SYMBOL) (allowed-symbols yes no unknown) (default unknown))
-           (slot cf (type FLOAT) (range 0.0 1.0) (default 0.0)))
-        """)
-
-        self.env.build("""
-        (deftemplate pest
-           (slot name (type STRING))
-           (slot scientific-name (type STRING))
-           (slot cf (type FLOAT) (range 0.0 1.0) (default 0.0))
-           (slot identified (type SYMBOL) (allowed-symbols yes no) (default no)))
-        """)
-
     def reset_system(self):
-        """Reset the expert system for a new consultation"""
+        """Reset the expert system for a new consultation
+
+        Resets are counted in both modes. A worn-out private environment is
+        rebuilt; a worn-out pooled one goes back to the pool, which replaces
+        it, even if the session never leaves it through consultation().
+        """
+        state = self._thread_state()
+        if state.checkout is not None:
+            max_uses = ENV_MAX_USES if self.pool is None else self.pool.max_uses
+            if state.checkout.uses >= max_uses:
+                if self.pool is None:
+                    state.checkout = None  # rebuilt by self.env
+                else:
+                    self.release_environment()  # rotated by the pool
         self.env.reset()
+        state.checkout.uses += 1
+        self._apply_output_mode()
 
     def assert_symptom(self, symptom_name, present=True, certainty=0.8):
         """Assert a symptom fact with certainty factor"""
-        present_val = "yes" if present else "no"
-        cf = min(1.0, max(0.0, certainty))
-        fact_str = f"(symptom (name {symptom_name}) (present {present_val}) (cf {cf}))"
-        self.env.assert_string(fact_str)
+        self.assert_symptoms(((symptom_name, certainty),), present=present)
+
+    def assert_symptoms(self, symptoms, present=True):
+        """Assert several symptom facts in one call
+
+        symptoms is a {symptom_name: cf} mapping or an iterable of
+        (symptom_name, cf) pairs. Names may use either spelling (hopper_burn
+        or hopper-burn); a symptom given more than once is asserted once,
+        with its last CF, as in the standalone engine. Every name and CF is
+        checked before any fact is asserted; the facts then go through the
+        symptom template directly, with no fact strings to build or parse.
+        """
+        if hasattr(symptoms, "items"):
+            symptoms = symptoms.items()
+        clips = _clips()
+        facts = {}
+        unknown = []
+        for symptom_name, certainty in symptoms:
+            name = clips_symptom_name(str(symptom_name))
+            if name not in self.symptoms_db:
+                unknown.append(str(symptom_name))
+                continue
+            facts[name] = min(1.0, max(0.0, float(certainty)))
+        if unknown:
+            raise ValueError(f"Unknown symptom(s): {', '.join(unknown)}")
+
+        present_val = clips.Symbol("yes" if present else "no")
+        template = self.env.find_template("symptom")
+        for name, cf in facts.items():
+            template.assert_fact(name=clips.Symbol(name), present=present_val, cf=cf)
 
     def run_inference(self):
         """Run the inference engine"""
         self.env.run()
 
+    def _pest_facts(self):
+        """(name, scientific-name, cf) of each identified pest fact
+
+        Only facts of the pest template are visited, and only the slots the
+        callers use are read.
+        """
+        for fact in self.env.find_template("pest").facts():
+            if fact["identified"] == "yes":
+                yield fact["name"], fact["scientific-name"], fact["cf"]
+
     def get_identified_pests(self):
-        """Get all identified pests from facts"""
-        pests = []
-        for fact in self.env.facts():
-            if str(fact.template.name) == "pest":
-                pest_data = {}
-                for slot in fact.template.slots:
-                    pest_data[slot.name] = fact[slot.name]
-                if pest_data.get("identified") == clips.Symbol("yes"):
-                    pests.append(pest_data)
-        return sorted(pests, key=lambda x: x.get("cf", 0), reverse=True)
+        """Get all identified pests from facts, highest CF first"""
+        pests = [
+            {"name": name, "scientific-name": scientific_name, "cf": cf}
+            for name, scientific_name, cf in self._pest_facts()
+        ]
+        return sorted(pests, key=lambda x: x["cf"], reverse=True)
+
+    def get_diagnosis(self):
+        """Identified pests with their control recommendations, in one pass
+
+        Each entry is a get_identified_pests() dict plus "recommendations",
+        the get_control_recommendations() view for that pest.
+        """
+        pests = self.get_identified_pests()
+        for pest in pests:
+            pest["recommendations"] = self.get_control_recommendations(pest["name"])
+        return pests
 
     def get_control_recommendations(self, pest_name):
-        """Get control recommendations for a specific pest"""
-        recommendations = {
-            "chemical": [],
-            "biological": [],
-            "cultural": [],
-            "mechanical": [],
-        }
+        """Get control recommendations for a specific pest, sorted by priority
 
-        for fact in self.env.facts():
-            if str(fact.template.name) == "control-recommendation":
-                if fact["pest-name"] == pest_name:
-                    control_type = str(fact["control-type"])
-                    rec = {
-                        "recommendation": fact["recommendation"],
-                        "priority": fact["priority"],
-                    }
-                    if control_type in recommendations:
-                        recommendations[control_type].append(rec)
-
-        for key in recommendations:
-            recommendations[key] = sorted(
-                recommendations[key], key=lambda x: x["priority"]
-            )
+        Returns a shared read-only {control_type: (recommendation, ...)} view
+        served from the knowledge base index; recommendations are static and
+        never enter CLIPS working memory.
+        """
+        return self.knowledge_base.get_recommendations(pest_name)
 
-        return recommendations
+    def render_control_plan(self, pest_name):
+        """Render a pest's control recommendations as text (cached)
+
+        The knowledge base renders and caches the plan, so both engines
+        print exactly the same IPM plan.
+        """
+        return self.knowledge_base.render_ipm_plan(pest_name)
 
     def display_symptoms_menu(self):
         """Display symptoms menu for user selection"""
@@ -367,21 +608,7 @@ class RicePestExpertSystem:
                         print(f"Favorable Conditions: {info['favorable_conditions']}")
                         print(f"Affected Stage: {info['affected_stage']}")
 
-                    print("\n--- CONTROL RECOMMENDATIONS ---")
-                    recs = self.get_control_recommendations(pest_name)
-
-                    for control_type in [
-                        "cultural",
-                        "mechanical",
-                        "biological",
-                        "chemical",
-                    ]:
-                        if recs[control_type]:
-                            print(f"\n[{control_type.upper()} CONTROL]")
-                            for rec in recs[control_type]:
-                                print(
-                                    f"  Priority {rec['priority']}: {rec['recommendation']}"
-                                )
+                    print(self.render_control_plan(pest_name))
 
                     print(f"\n{'*' * 60}")
             else:
@@ -409,6 +636,26 @@ class RicePestExpertSystem:
 
 def main():
     """Main function to run the expert system"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--list-symptoms",
+        action="store_true",
+        help="print the observable symptoms and exit (does not load CLIPS)",
+    )
+    parser.add_argument(
+        "--build-image",
+        action="store_true",
+        help="compile rice_pest_rules.clp into a binary image for faster loading",
+    )
+    args = parser.parse_args()
+
+    if args.build_image:
+        print(f"Wrote {build_rule_image()}")
+        return
+    if args.list_symptoms:
+        RicePestExpertSystem().display_symptoms_menu()
+        return
+
     print("\n" + "#" * 70)
     print("#" + " " * 68 + "#")
     print("#    RULE-BASED RICE PEST IDENTIFICATION AND CONTROL SYSTEM" + " " * 8 + "#")
@@ -418,6 +665,7 @@ def main():
 
     try:
         expert_system = RicePestExpertSystem()
+        expert_system.env  # fail here, not mid-consultation, if clipspy is missing
         expert_system.interactive_diagnosis()
     except Exception as e:
         print(f"\nError initializing expert system: {e}")
@@ -3,26 +3,65 @@ Rule-Based Rice Pest Identification and Control Recommendation System
 For Malaysian Rice Cultivation
 Standalone Python Implementation with Forward Chaining and Certainty Factor
 
-This version does not require CLIPS installation.
+This version does not require CLIPS installation. The knowledge base is
+read from rice_pest_knowledge_base.json (or a CSV directory / SQLite file,
+see read_knowledge_source) and cached in compiled form.
 
 Author: Expert System Project - TES6313
 """
 
+import hashlib
+import heapq
+import os
+import pickle
+from array import array
+from types import MappingProxyType
+
+# Intermediate facts whose combined CF moves less than this are not
+# re-propagated, which bounds agenda cycles in cyclic rule bases.
+CF_TOLERANCE = 1e-9
+
+# Session CF slot value of a symptom that is not present (CFs are 0.0-1.0).
+ABSENT = -1.0
+
+CONTROL_TYPES = ("chemical", "biological", "cultural", "mechanical")
+IPM_DISPLAY_ORDER = ("cultural", "mechanical", "biological", "chemical")
+
+DEFAULT_KNOWLEDGE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "rice_pest_knowledge_base.json"
+)
+KNOWLEDGE_SECTIONS = ("symptoms", "pests", "rules", "recommendations")
+# Bump when the compiled KnowledgeBase layout changes to invalidate caches.
+KB_CACHE_VERSION = 2
+
 
 class Symptom:
-    """Represents a symptom with certainty factor"""
+    """Represents a symptom in the knowledge base
 
-    def __init__(self, name, description, pest_hint, present=False, cf=0.0):
+    Whether a symptom is present, and with which certainty factor, is
+    consultation state and lives in RicePestExpertSystem.
+    """
+
+    __slots__ = ("name", "description", "pest_hint")
+
+    def __init__(self, name, description, pest_hint):
         self.name = name
         self.description = description
         self.pest_hint = pest_hint
-        self.present = present
-        self.cf = cf  # Certainty Factor (0.0 to 1.0)
 
 
 class Pest:
     """Represents a pest with identification confidence"""
 
+    __slots__ = (
+        "name",
+        "scientific_name",
+        "description",
+        "damage_type",
+        "favorable_conditions",
+        "affected_stage",
+    )
+
     def __init__(
         self,
         name,
@@ -43,6 +82,8 @@ class Pest:
 class ControlRecommendation:
     """Represents a control recommendation"""
 
+    __slots__ = ("pest_name", "control_type", "recommendation", "priority")
+
     def __init__(self, pest_name, control_type, recommendation, priority):
         self.pest_name = pest_name
         self.control_type = control_type  # chemical, biological, cultural, mechanical
@@ -51,465 +92,251 @@ class ControlRecommendation:
 
 
 class Rule:
-    """Represents an inference rule for pest identification"""
+    """Represents an inference rule for pest identification
+
+    A rule with concludes set asserts that intermediate fact (for example
+    "sucking_pest_damage") instead of identifying a pest. Other rules can
+    require the fact in required_symptoms like any observed symptom.
+    """
 
-    def __init__(self, rule_id, pest_name, required_symptoms, rule_cf):
+    __slots__ = ("rule_id", "pest_name", "required_symptoms", "rule_cf", "concludes")
+
+    def __init__(self, rule_id, pest_name, required_symptoms, rule_cf, concludes=None):
         self.rule_id = rule_id
         self.pest_name = pest_name
-        self.required_symptoms = required_symptoms  # List of symptom names
+        self.required_symptoms = tuple(required_symptoms)  # Symptom/fact names
         self.rule_cf = rule_cf  # Rule confidence factor
+        self.concludes = concludes  # Intermediate fact name, None for pest rules
 
+    @property
+    def conclusion(self):
+        """Name of the pest or intermediate fact this rule concludes"""
+        return self.concludes if self.concludes is not None else self.pest_name
 
-class RicePestExpertSystem:
-    """Forward Chaining Expert System for Rice Pest Identification"""
 
-    def __init__(self):
+class Diagnosis:
+    """Result of a single diagnosis"""
+
+    __slots__ = ("identified_pests", "fired_rules")
+
+    def __init__(self, identified_pests, fired_rules):
+        self.identified_pests = identified_pests  # pest_name -> combined CF
+        self.fired_rules = fired_rules  # [(rule_id, conclusion, cf), ...]
+
+    def ranked_pests(self):
+        """Identified pests as (pest_name, cf) pairs, most likely first"""
+        return sorted(self.identified_pests.items(), key=lambda x: x[1], reverse=True)
+
+
+class KnowledgeBase:
+    """Symptoms, pests, rules and recommendations plus their compiled indexes
+
+    The knowledge base is never modified after construction, so one
+    instance can be shared by any number of consultations and threads.
+    Per-consultation state lives in RicePestExpertSystem or is passed to
+    diagnose() explicitly.
+    """
+
+    def __init__(self, data=None):
         self.symptoms = {}
         self.pests = {}
         self.rules = []
         self.control_recommendations = []
-        self.identified_pests = {}  # pest_name -> combined CF
-        self._initialize_knowledge_base()
+        self.symptom_rule_index = {}  # symptom_name -> indices into self.rules
+        self.symptom_bits = {}  # symptom_name -> bit (1 << position)
+        self.rule_masks = []  # (required-symptom mask, rule) in rule order
+        self.symptom_names = []  # symptom ordinal order (diagnose_batch columns)
+        self.symptom_ordinals = {}  # symptom_name -> ordinal
+        self.absent_cfs = array("d")  # initial per-session symptom CF array
+        self.pest_names = []  # pest column order for diagnose_batch
+        self.has_intermediate_facts = False  # any rule concludes a derived fact
+        self.rule_strata = []  # derivation depth per rule, for conflict resolution
+        self.recommendation_index = {}  # pest_name -> {control_type: (rec, ...)}
+        self._ipm_plans = {}  # pest_name -> rendered IPM plan, filled on demand
+        self._no_recommendations = MappingProxyType({c: () for c in CONTROL_TYPES})
+        self._batch_matrices = None  # compiled lazily, requires NumPy
+        if data is None:
+            data = read_knowledge_source(DEFAULT_KNOWLEDGE_FILE)
+        self._initialize_knowledge_base(data)
+
+    def _initialize_knowledge_base(self, data):
+        """Initialize symptoms, pests, rules and recommendations from records
+
+        data holds "symptoms", "pests", "rules" and "recommendations"
+        record lists as returned by read_knowledge_source.
+        """
+        self._init_symptoms(data["symptoms"])
+        self._init_pests(data["pests"])
+        self._init_rules(data["rules"])
+        self._init_control_recommendations(data["recommendations"])
+        self._validate()
+        self._build_rule_index()
+        self._compile_rule_masks()
+        self._build_rule_strata()
+        self._build_recommendation_index()
+
+    def _build_rule_index(self):
+        """Index rules by the symptoms they require (inverted symptom -> rule index)"""
+        self.symptom_rule_index = {}
+        for idx, rule in enumerate(self.rules):
+            for sym_name in rule.required_symptoms:
+                self.symptom_rule_index.setdefault(sym_name, []).append(idx)
 
-    def _initialize_knowledge_base(self):
-        """Initialize the knowledge base with symptoms, pests, rules, and recommendations"""
-        self._init_symptoms()
-        self._init_pests()
-        self._init_rules()
-        self._init_control_recommendations()
+        self.symptom_names = list(self.symptoms)
+        self.symptom_ordinals = {name: i for i, name in enumerate(self.symptom_names)}
+        self.absent_cfs = array("d", [ABSENT] * len(self.symptom_names))
+        self.pest_names = list(self.pests)
+        for rule in self.rules:
+            if rule.concludes is None and rule.pest_name not in self.pest_names:
+                self.pest_names.append(rule.pest_name)
+        self.has_intermediate_facts = any(r.concludes is not None for r in self.rules)
+
+    def _compile_rule_masks(self):
+        """Assign each symptom a bit position and compile rules to bit masks
+
+        Symptoms referenced by a rule but missing from the symptom database
+        get their own bits; they can never be observed, so such rules never
+        fire, exactly as in diagnose().
+        """
+        self.symptom_bits = {}
+        for position, sym_name in enumerate(self.symptoms):
+            self.symptom_bits[sym_name] = 1 << position
+
+        self.rule_masks = []
+        for rule in self.rules:
+            mask = 0
+            for sym_name in rule.required_symptoms:
+                if sym_name not in self.symptom_bits:
+                    self.symptom_bits[sym_name] = 1 << len(self.symptom_bits)
+                mask |= self.symptom_bits[sym_name]
+            if mask:
+                self.rule_masks.append((mask, rule))
+
+    def _build_rule_strata(self):
+        """Assign each rule its derivation depth
+
+        Rules over observed symptoms only are stratum 0; a rule requiring an
+        intermediate fact sits above every rule that concludes that fact.
+        The agenda fires lower strata first so consumers normally see their
+        inputs complete and fire once. Facts that depend on each other (one
+        strongly connected component of the fact graph) share a level, so a
+        cycle adds one stratum however many rules it spans.
+        """
+        self.rule_strata = [0] * len(self.rules)
+        if not self.has_intermediate_facts:
+            return
+
+        producers = {}  # intermediate fact -> rules concluding it
+        for rule in self.rules:
+            if rule.concludes is not None:
+                producers.setdefault(rule.concludes, []).append(rule)
+        depends_on = {
+            fact: {s for rule in rules for s in rule.required_symptoms if s in producers}
+            for fact, rules in producers.items()
+        }
+
+        fact_levels = {}  # intermediate fact -> 1 + stratum of its deepest rule
+        for component in _strongly_connected(depends_on):
+            level = 1 + max(
+                (
+                    fact_levels.get(s, 0)
+                    for fact in component
+                    for rule in producers[fact]
+                    for s in rule.required_symptoms
+                    if s not in component
+                ),
+                default=0,
+            )
+            for fact in component:
+                fact_levels[fact] = level
 
-    def _init_symptoms(self):
-        """Initialize symptom database"""
-        symptom_data = [
-            # Brown Planthopper symptoms
-            (
-                "hopper_burn",
-                "Plants appear burnt/scorched in circular patches (hopper burn)",
-                "Brown Planthopper",
-            ),
-            (
-                "yellowing_drying",
-                "Yellowing and drying of plants from bottom upwards",
-                "Brown Planthopper",
-            ),
-            (
-                "circular_patches",
-                "Circular patches of dead/dying plants in the field",
-                "Brown Planthopper",
-            ),
-            (
-                "honeydew_sooty_mold",
-                "Honeydew secretion with black sooty mold on plants",
-                "Brown Planthopper",
-            ),
-            (
-                "plant_base_insects",
-                "Small brown insects visible at the base of plants",
-                "Brown Planthopper",
-            ),
-            # Yellow Stem Borer symptoms
-            (
-                "dead_heart",
-                "Central shoot/tiller dies and turns brown (dead heart) - vegetative stage",
-                "Yellow Stem Borer",
-            ),
-            (
-                "central_shoot_withered",
-                "Central leaf whorl unfolds incompletely and withers",
-                "Yellow Stem Borer",
-            ),
-            (
-                "stem_bore_holes",
-                "Visible bore holes at the stem base with frass",
-                "Yellow Stem Borer",
-            ),
-            (
-                "white_head",
-                "White/empty panicles that can be easily pulled out (white head) - reproductive stage",
-                "Yellow Stem Borer",
-            ),
-            (
-                "empty_panicles",
-                "Panicles are chaffy/empty with no grain filling",
-                "Yellow Stem Borer",
-            ),
-            (
-                "egg_mass_on_leaves",
-                "Yellowish-brown hairy egg masses on leaf blades",
-                "Yellow Stem Borer",
-            ),
-            (
-                "larval_feeding_marks",
-                "Larvae feeding marks on leaf sheath before boring",
-                "Yellow Stem Borer",
-            ),
-            # Rice Leaf Folder symptoms
-            (
-                "folded_leaves",
-                "Leaves are folded longitudinally with silk threads",
-                "Rice Leaf Folder",
-            ),
-            (
-                "leaf_scraping",
-                "Scraping damage on leaf surface (green tissue removed)",
-                "Rice Leaf Folder",
-            ),
-            (
-                "whitish_streaks",
-                "Whitish/transparent streaks on damaged leaves",
-                "Rice Leaf Folder",
-            ),
-            (
-                "tubular_folded_leaf",
-                "Leaf rolled into a tubular structure",
-                "Rice Leaf Folder",
-            ),
-            (
-                "larvae_inside_leaf",
-                "Green caterpillar/larvae found inside folded leaves",
-                "Rice Leaf Folder",
-            ),
-            # Rice Gall Midge symptoms
-            (
-                "silver_shoot",
-                "Silver-white hollow tillers (silver shoot/onion shoot)",
-                "Rice Gall Midge",
-            ),
-            (
-                "onion_leaf_gall",
-                "Gall formation with onion leaf-like appearance",
-                "Rice Gall Midge",
-            ),
-            (
-                "stunted_tillers",
-                "Stunted growth of affected tillers",
-                "Rice Gall Midge",
-            ),
-            (
-                "no_panicle_emergence",
-                "Affected tillers fail to produce panicles",
-                "Rice Gall Midge",
-            ),
-            (
-                "elongated_leaf_sheath",
-                "Elongated and pale green leaf sheath",
-                "Rice Gall Midge",
-            ),
-            # Rice Bug symptoms
-            ("foul_smell", "Strong foul/unpleasant smell in the field", "Rice Bug"),
-            (
-                "empty_grains",
-                "Empty or partially filled grains at maturity",
-                "Rice Bug",
-            ),
-            (
-                "discolored_grains",
-                "Discolored spots on grains (feeding marks)",
-                "Rice Bug",
-            ),
-        ]
+        for idx, rule in enumerate(self.rules):
+            self.rule_strata[idx] = max(
+                (fact_levels.get(s, 0) for s in rule.required_symptoms), default=0
+            )
 
-        for name, desc, hint in symptom_data:
-            self.symptoms[name] = Symptom(name, desc, hint)
+    def _init_symptoms(self, records):
+        """Initialize symptom database"""
+        for rec in records:
+            self.symptoms[rec["name"]] = Symptom(
+                rec["name"], rec["description"], rec["pest_hint"]
+            )
 
-    def _init_pests(self):
+    def _init_pests(self, records):
         """Initialize pest database"""
-        pest_data = [
-            (
-                "Brown Planthopper",
-                "Nilaparvata lugens",
-                "Small brown sucking insect that feeds on plant sap at the base of rice plants",
-                "Causes hopper burn - plants dry up and appear scorched",
-                "High humidity, excessive nitrogen use, continuous flooding",
-                "All growth stages, especially tillering to heading",
-            ),
-            (
-                "Yellow Stem Borer",
-                "Scirpophaga incertulas",
-                "Larvae bore into rice stems causing dead hearts and white heads",
-                "Dead heart in vegetative stage, White head in reproductive stage",
-                "Staggered planting, presence of stubbles, high nitrogen",
-                "Tillering (dead heart) and heading (white head) stages",
-            ),
-            (
-                "Rice Leaf Folder",
-                "Cnaphalocrocis medinalis",
-                "Caterpillar folds leaves and feeds on green tissue inside",
-                "Reduces photosynthetic area, whitish streaks on leaves",
-                "High humidity, shaded/dense canopy, excessive nitrogen",
-                "Vegetative to reproductive stages",
-            ),
-            (
-                "Rice Gall Midge",
-                "Orseolia oryzae",
-                "Maggot causes gall formation producing silver shoots",
-                "Silver shoot/onion leaf - tillers become tubular and fail to produce panicles",
-                "Cloudy weather, high humidity, late planting",
-                "Seedling to tillering stages",
-            ),
-            (
-                "Rice Bug",
-                "Leptocorisa oratorius",
-                "Slender green/brown bug that sucks sap from developing grains",
-                "Empty/partially filled grains, reduced grain quality",
-                "Weedy fields, staggered harvesting, presence of wild grasses",
-                "Flowering to grain filling stages",
-            ),
-        ]
-
-        for name, sci, desc, damage, cond, stage in pest_data:
-            self.pests[name] = Pest(name, sci, desc, damage, cond, stage)
+        for rec in records:
+            self.pests[rec["name"]] = Pest(
+                rec["name"],
+                rec["scientific_name"],
+                rec["description"],
+                rec["damage_type"],
+                rec["favorable_conditions"],
+                rec["affected_stage"],
+            )
 
-    def _init_rules(self):
+    def _init_rules(self, records):
         """Initialize inference rules with certainty factors"""
         self.rules = [
-            # Brown Planthopper rules
-            Rule(
-                "R1",
-                "Brown Planthopper",
-                ["hopper_burn", "yellowing_drying", "circular_patches"],
-                0.95,
-            ),
-            Rule(
-                "R2",
-                "Brown Planthopper",
-                ["honeydew_sooty_mold", "plant_base_insects"],
-                0.75,
-            ),
-            Rule(
-                "R3", "Brown Planthopper", ["hopper_burn", "plant_base_insects"], 0.85
-            ),
-            # Yellow Stem Borer rules
-            Rule(
-                "R4",
-                "Yellow Stem Borer",
-                ["dead_heart", "central_shoot_withered", "stem_bore_holes"],
-                0.92,
-            ),
-            Rule("R5", "Yellow Stem Borer", ["white_head", "empty_panicles"], 0.88),
-            Rule(
-                "R6",
-                "Yellow Stem Borer",
-                ["egg_mass_on_leaves", "larval_feeding_marks"],
-                0.70,
-            ),
-            Rule("R7", "Yellow Stem Borer", ["dead_heart", "stem_bore_holes"], 0.85),
-            # Rice Leaf Folder rules
-            Rule(
-                "R8",
-                "Rice Leaf Folder",
-                ["folded_leaves", "leaf_scraping", "whitish_streaks"],
-                0.93,
-            ),
-            Rule(
-                "R9",
-                "Rice Leaf Folder",
-                ["tubular_folded_leaf", "larvae_inside_leaf"],
-                0.85,
-            ),
-            Rule(
-                "R10", "Rice Leaf Folder", ["folded_leaves", "larvae_inside_leaf"], 0.90
-            ),
-            # Rice Gall Midge rules
-            Rule("R11", "Rice Gall Midge", ["silver_shoot", "onion_leaf_gall"], 0.95),
             Rule(
-                "R12",
-                "Rice Gall Midge",
-                ["stunted_tillers", "no_panicle_emergence", "elongated_leaf_sheath"],
-                0.78,
-            ),
-            Rule(
-                "R13", "Rice Gall Midge", ["silver_shoot", "no_panicle_emergence"], 0.88
-            ),
-            # Rice Bug rules
-            Rule(
-                "R14",
-                "Rice Bug",
-                ["foul_smell", "empty_grains", "discolored_grains"],
-                0.85,
-            ),
-            Rule("R15", "Rice Bug", ["foul_smell", "empty_grains"], 0.75),
+                rec["rule_id"],
+                rec.get("pest_name") or None,
+                rec["required_symptoms"],
+                float(rec["rule_cf"]),
+                concludes=rec.get("concludes") or None,
+            )
+            for rec in records
         ]
 
-    def _init_control_recommendations(self):
+    def _init_control_recommendations(self, records):
         """Initialize control recommendations database"""
-        rec_data = [
-            # Brown Planthopper
-            (
-                "Brown Planthopper",
-                "chemical",
-                "Apply Imidacloprid 17.8 SL at 100-125 ml/ha or Thiamethoxam 25 WG at 100g/ha",
-                1,
-            ),
-            (
-                "Brown Planthopper",
-                "chemical",
-                "Apply Buprofezin 25 SC at 1.5-2.0 ml/L for nymph control",
-                2,
-            ),
-            (
-                "Brown Planthopper",
-                "biological",
-                "Conserve natural enemies: Cyrtorhinus lividipennis (mirid bug), Lycosa pseudoannulata (wolf spider)",
-                1,
-            ),
-            (
-                "Brown Planthopper",
-                "cultural",
-                "Avoid excessive nitrogen application; Use resistant varieties like MR219, MR220",
-                1,
-            ),
-            (
-                "Brown Planthopper",
-                "mechanical",
-                "Use light traps (15W bulb) to monitor and reduce adult population",
-                2,
-            ),
-            # Yellow Stem Borer
-            (
-                "Yellow Stem Borer",
-                "chemical",
-                "Apply Cartap hydrochloride 4G at 25 kg/ha or Chlorantraniliprole 18.5 SC at 150 ml/ha",
-                1,
-            ),
-            (
-                "Yellow Stem Borer",
-                "chemical",
-                "Spray Fipronil 5 SC at 1.5-2.0 ml/L at tillering stage",
-                2,
-            ),
-            (
-                "Yellow Stem Borer",
-                "biological",
-                "Release Trichogramma japonicum egg parasitoid at 100,000/ha at weekly intervals",
-                1,
-            ),
-            (
-                "Yellow Stem Borer",
-                "biological",
-                "Conserve predators: Conocephalus longipennis, Anaxipha longipennis",
-                2,
-            ),
-            (
-                "Yellow Stem Borer",
-                "cultural",
-                "Remove and destroy stubbles after harvest; Synchronize planting in the area",
-                1,
-            ),
-            (
-                "Yellow Stem Borer",
-                "mechanical",
-                "Use pheromone traps (5/ha) for monitoring; Collect and destroy egg masses",
-                1,
-            ),
-            # Rice Leaf Folder
-            (
-                "Rice Leaf Folder",
-                "chemical",
-                "Apply Chlorantraniliprole 18.5 SC at 150 ml/ha or Flubendiamide 39.35 SC at 50 ml/ha",
-                1,
-            ),
-            (
-                "Rice Leaf Folder",
-                "chemical",
-                "Spray Quinalphos 25 EC at 2 ml/L when damage exceeds economic threshold",
-                2,
-            ),
-            (
-                "Rice Leaf Folder",
-                "biological",
-                "Release Trichogramma chilonis at 50,000/ha; Conserve Apanteles spp. parasitoids",
-                1,
-            ),
-            (
-                "Rice Leaf Folder",
-                "cultural",
-                "Avoid excessive nitrogen; Maintain field sanitation; Remove grassy weeds",
-                1,
-            ),
-            (
-                "Rice Leaf Folder",
-                "mechanical",
-                "Use light traps to attract and kill adult moths",
-                2,
-            ),
-            # Rice Gall Midge
-            (
-                "Rice Gall Midge",
-                "chemical",
-                "Apply Carbofuran 3G at 25-30 kg/ha in nursery or Fipronil 0.3G at 25 kg/ha",
-                1,
-            ),
-            (
-                "Rice Gall Midge",
-                "chemical",
-                "Seed treatment with Thiamethoxam 70 WS at 3g/kg seed",
-                2,
-            ),
-            (
-                "Rice Gall Midge",
-                "biological",
-                "Conserve Platygaster oryzae parasitoid; Maintain spider population in fields",
-                1,
-            ),
-            (
-                "Rice Gall Midge",
-                "cultural",
-                "Use resistant varieties; Early and synchronous planting; Destroy ratoon and volunteer plants",
-                1,
-            ),
-            (
-                "Rice Gall Midge",
-                "mechanical",
-                "Pull out and destroy affected tillers (silver shoots)",
-                1,
-            ),
-            # Rice Bug
-            (
-                "Rice Bug",
-                "chemical",
-                "Apply Carbaryl 85 WP at 1.5 kg/ha or Lambda-cyhalothrin 5 EC at 300 ml/ha",
-                1,
-            ),
-            (
-                "Rice Bug",
-                "biological",
-                "Conserve egg parasitoids Gryon nixoni and Ooencyrtus spp.",
-                1,
-            ),
-            (
-                "Rice Bug",
-                "cultural",
-                "Remove weeds around bunds; Synchronize planting to avoid staggered harvesting",
-                1,
-            ),
-            (
-                "Rice Bug",
-                "mechanical",
-                "Collect bugs using sweep nets during early morning when less active",
-                2,
-            ),
-        ]
-
-        for pest, ctype, rec, pri in rec_data:
+        for rec in records:
             self.control_recommendations.append(
-                ControlRecommendation(pest, ctype, rec, pri)
+                ControlRecommendation(
+                    rec["pest_name"],
+                    rec["control_type"],
+                    rec["recommendation"],
+                    int(rec["priority"]),
+                )
             )
 
-    def reset(self):
-        """Reset the system for a new consultation"""
-        for symptom in self.symptoms.values():
-            symptom.present = False
-            symptom.cf = 0.0
-        self.identified_pests = {}
+    def _validate(self):
+        """Check the loaded knowledge for inconsistencies
 
-    def set_symptom(self, symptom_name, present=True, cf=0.8):
-        """Set a symptom as present with a certainty factor"""
-        if symptom_name in self.symptoms:
-            self.symptoms[symptom_name].present = present
-            self.symptoms[symptom_name].cf = min(1.0, max(0.0, cf))
-            return True
-        return False
+        Raises ValueError listing every problem found.
+        """
+        problems = []
+        derived = {r.concludes for r in self.rules if r.concludes is not None}
+        seen_rules = set()
+
+        for rule in self.rules:
+            if rule.rule_id in seen_rules:
+                problems.append(f"duplicate rule id {rule.rule_id}")
+            seen_rules.add(rule.rule_id)
+            if (rule.pest_name is None) == (rule.concludes is None):
+                problems.append(
+                    f"rule {rule.rule_id} needs exactly one of pest_name/concludes"
+                )
+            if not rule.required_symptoms:
+                problems.append(f"rule {rule.rule_id} has no required symptoms")
+            if not 0.0 <= rule.rule_cf <= 1.0:
+                problems.append(
+                    f"rule {rule.rule_id} has rule_cf {rule.rule_cf} outside 0-1"
+                )
+            for sym_name in rule.required_symptoms:
+                if sym_name not in self.symptoms and sym_name not in derived:
+                    problems.append(
+                        f"rule {rule.rule_id} requires unknown symptom {sym_name}"
+                    )
+
+        for rec in self.control_recommendations:
+            if rec.control_type not in CONTROL_TYPES:
+                problems.append(
+                    f"recommendation for {rec.pest_name} has unknown control type "
+                    f"{rec.control_type}"
+                )
+
+        if problems:
+            raise ValueError("Invalid knowledge base:\n  " + "\n  ".join(problems))
 
     def combine_cf(self, cf1, cf2):
         """Combine two certainty factors using the standard formula"""
@@ -520,52 +347,669 @@ class RicePestExpertSystem:
         else:
             return (cf1 + cf2) / (1 - min(abs(cf1), abs(cf2)))
 
-    def forward_chain(self):
-        """Execute forward chaining inference"""
-        self.identified_pests = {}
+    def _observed_cfs(self, observations):
+        """Normalize observations to {symptom_name: clamped CF} for known symptoms"""
+        if not isinstance(observations, dict):
+            observations = dict(observations)
+        return {
+            name: min(1.0, max(0.0, cf))
+            for name, cf in observations.items()
+            if name in self.symptoms
+        }
+
+    def diagnose(self, observations):
+        """Run forward chaining for one case and return a Diagnosis
+
+        observations maps the names of the present symptoms to their
+        certainty factors (an iterable of (name, cf) pairs also works);
+        unknown names are ignored. Nothing outside the call is modified,
+        so concurrent calls on one knowledge base are safe.
+
+        Only rules reachable from the observed symptoms through the
+        symptom -> rule index are evaluated. Candidates are visited in rule
+        base order so fired rules and CF combination match a full scan.
+        Rule bases with intermediate facts run on the agenda engine instead.
+        """
+        observed = self._observed_cfs(observations)
+        if self.has_intermediate_facts:
+            return self._run_agenda(observed)
+
+        identified_pests = {}
         fired_rules = []
 
-        for rule in self.rules:
-            all_present = True
+        candidates = set()
+        for sym_name in observed:
+            candidates.update(self.symptom_rule_index.get(sym_name, ()))
+
+        for idx in sorted(candidates):
+            rule = self.rules[idx]
             symptom_cfs = []
 
             for sym_name in rule.required_symptoms:
-                if sym_name in self.symptoms and self.symptoms[sym_name].present:
-                    symptom_cfs.append(self.symptoms[sym_name].cf)
-                else:
-                    all_present = False
+                if sym_name not in observed:
                     break
+                symptom_cfs.append(observed[sym_name])
+            else:
+                fired_rules.append(
+                    self._fire_rule(rule, symptom_cfs, identified_pests)
+                )
 
-            if all_present and symptom_cfs:
-                avg_symptom_cf = sum(symptom_cfs) / len(symptom_cfs)
-                final_cf = avg_symptom_cf * rule.rule_cf
+        return Diagnosis(identified_pests, fired_rules)
+
+    def _run_agenda(self, observed):
+        """Agenda-based forward chaining to a fixpoint
+
+        Working memory starts as the observed symptoms. A rule is scheduled
+        only when one of its inputs enters or changes in working memory, and
+        the agenda resolves conflicts by stratum, then rule base order. A
+        firing replaces the rule's previous contribution to its conclusion;
+        when an intermediate fact's combined CF changes, the rules that
+        consume it are scheduled again. Inference ends when the agenda is
+        empty.
+        """
+        facts = dict(observed)  # working memory: fact name -> CF
+        rule_cfs = {}  # rule index -> CF of its latest firing
+        evidence = {}  # intermediate fact -> {rule index: CF}
+        pest_evidence = {}  # pest_name -> {rule index: CF}
+        agenda = []
+        scheduled = set()
+
+        def schedule(fact_name):
+            for idx in self.symptom_rule_index.get(fact_name, ()):
+                if idx not in scheduled:
+                    scheduled.add(idx)
+                    heapq.heappush(agenda, (self.rule_strata[idx], idx))
+
+        for sym_name in observed:
+            schedule(sym_name)
+
+        while agenda:
+            _, idx = heapq.heappop(agenda)
+            scheduled.discard(idx)
+            rule = self.rules[idx]
+
+            if not all(s in facts for s in rule.required_symptoms):
+                continue
+            symptom_cfs = [facts[s] for s in rule.required_symptoms]
+            final_cf = sum(symptom_cfs) / len(symptom_cfs) * rule.rule_cf
+            if rule_cfs.get(idx) == final_cf:
+                continue
 
-                if rule.pest_name in self.identified_pests:
-                    existing_cf = self.identified_pests[rule.pest_name]
-                    self.identified_pests[rule.pest_name] = self.combine_cf(
-                        existing_cf, final_cf
-                    )
-                else:
-                    self.identified_pests[rule.pest_name] = final_cf
+            rule_cfs[idx] = final_cf
 
-                fired_rules.append((rule.rule_id, rule.pest_name, final_cf))
+            if rule.concludes is None:
+                pest_evidence.setdefault(rule.pest_name, {})[idx] = final_cf
+            else:
+                evidence.setdefault(rule.concludes, {})[idx] = final_cf
+                combined = self._combine_evidence(evidence[rule.concludes])
+                previous = facts.get(rule.concludes)
+                if previous is None or abs(combined - previous) > CF_TOLERANCE:
+                    facts[rule.concludes] = combined
+                    schedule(rule.concludes)
+
+        identified_pests = {
+            pest_name: self._combine_evidence(contributions)
+            for pest_name, contributions in pest_evidence.items()
+        }
+        fired_rules = [
+            (self.rules[idx].rule_id, self.rules[idx].conclusion, cf)
+            for idx, cf in sorted(rule_cfs.items())
+        ]
+        return Diagnosis(identified_pests, fired_rules)
+
+    def _combine_evidence(self, contributions):
+        """Fold {rule index: CF} with combine_cf in rule base order"""
+        combined = None
+        for idx in sorted(contributions):
+            cf = contributions[idx]
+            combined = cf if combined is None else self.combine_cf(combined, cf)
+        return combined
+
+    def diagnose_bitset(self, observations):
+        """Run forward chaining for one case using bitset rule matching
+
+        A rule fires when every bit of its compiled symptom mask is set in
+        the observed mask, i.e. (observed & mask) == mask. Produces the same
+        Diagnosis as diagnose(). Single-level rule bases only.
+        """
+        if self.has_intermediate_facts:
+            raise ValueError("Bitset matching does not support intermediate facts")
+        observed = self._observed_cfs(observations)
+        identified_pests = {}
+        fired_rules = []
+
+        observed_mask = 0
+        for sym_name in observed:
+            observed_mask |= self.symptom_bits[sym_name]
+
+        for mask, rule in self.rule_masks:
+            if observed_mask & mask == mask:
+                symptom_cfs = [observed[s] for s in rule.required_symptoms]
+                fired_rules.append(self._fire_rule(rule, symptom_cfs, identified_pests))
+
+        return Diagnosis(identified_pests, fired_rules)
+
+    def _fire_rule(self, rule, symptom_cfs, identified_pests):
+        """Apply a matched rule and combine its CF into identified_pests"""
+        avg_symptom_cf = sum(symptom_cfs) / len(symptom_cfs)
+        final_cf = avg_symptom_cf * rule.rule_cf
+
+        if rule.pest_name in identified_pests:
+            existing_cf = identified_pests[rule.pest_name]
+            identified_pests[rule.pest_name] = self.combine_cf(existing_cf, final_cf)
+        else:
+            identified_pests[rule.pest_name] = final_cf
 
-        return fired_rules
+        return (rule.rule_id, rule.pest_name, final_cf)
+
+    def _compile_batch_matrices(self):
+        """Compile the rule base into NumPy arrays for diagnose_batch"""
+        import numpy as np
+
+        columns = {name: i for i, name in enumerate(self.symptom_names)}
+        batch_rules = [
+            rule
+            for rule in self.rules
+            if rule.required_symptoms
+            and all(s in columns for s in rule.required_symptoms)
+        ]
+
+        incidence = np.zeros((len(columns), len(batch_rules)))
+        for j, rule in enumerate(batch_rules):
+            for sym_name in rule.required_symptoms:
+                incidence[columns[sym_name], j] = 1.0
+
+        sizes = incidence.sum(axis=0)
+        rule_cfs = np.array([rule.rule_cf for rule in batch_rules], dtype=float)
+        pest_rules = [
+            np.array(
+                [j for j, rule in enumerate(batch_rules) if rule.pest_name == pest],
+                dtype=np.intp,
+            )
+            for pest in self.pest_names
+        ]
+        self._batch_matrices = (incidence, sizes, rule_cfs, pest_rules)
+
+    def diagnose_batch(self, symptom_cfs):
+        """Diagnose many cases at once with array operations
+
+        symptom_cfs is an (n_cases x n_symptoms) array-like whose columns
+        follow self.symptom_names (the _init_symptoms order). A CF of 0.0
+        or more marks the symptom as present, as in diagnose(); ABSENT (any
+        negative value) or NaN marks it absent. Returns an (n_cases x n_pests)
+        NumPy array of combined CFs with columns following self.pest_names,
+        matching diagnose() per case up to floating-point rounding.
+        Single-level rule bases only. Requires NumPy.
+        """
+        import numpy as np
+
+        if self.has_intermediate_facts:
+            raise ValueError("Batch diagnosis does not support intermediate facts")
+
+        cfs = np.asarray(symptom_cfs, dtype=float)
+        if cfs.ndim != 2 or cfs.shape[1] != len(self.symptom_names):
+            raise ValueError(
+                f"Expected an (n_cases x {len(self.symptom_names)}) symptom CF matrix, "
+                f"got shape {cfs.shape}"
+            )
+        if self._batch_matrices is None:
+            self._compile_batch_matrices()
+        incidence, sizes, rule_cfs, pest_rules = self._batch_matrices
+
+        present = cfs >= 0.0  # False for ABSENT and NaN
+        cfs = np.where(present, np.minimum(cfs, 1.0), 0.0)
+
+        # A rule fires when all its symptoms are present; its CF is the
+        # average symptom CF times rule_cf.
+        fired = present.astype(float) @ incidence == sizes
+        rule_results = np.where(fired, (cfs @ incidence) / sizes * rule_cfs, 0.0)
+
+        # combine_cf for non-negative CFs folds to 1 - prod(1 - cf_i).
+        pest_cfs = np.zeros((cfs.shape[0], len(self.pest_names)))
+        for k, rule_idx in enumerate(pest_rules):
+            if rule_idx.size:
+                pest_cfs[:, k] = 1.0 - np.prod(1.0 - rule_results[:, rule_idx], axis=1)
+        return pest_cfs
+
+    def _build_recommendation_index(self):
+        """Group recommendations per pest and control type, sorted by priority
+
+        Each pest maps to a read-only {control_type: (recommendation, ...)}
+        view whose entries are read-only {"recommendation", "priority"}
+        mappings, shared by every caller of get_recommendations.
+        """
+        grouped = {}
+        for rec in sorted(self.control_recommendations, key=lambda r: r.priority):
+            by_type = grouped.setdefault(
+                rec.pest_name, {ctype: [] for ctype in CONTROL_TYPES}
+            )
+            by_type.setdefault(rec.control_type, []).append(
+                {"recommendation": rec.recommendation, "priority": rec.priority}
+            )
+
+        self.recommendation_index = _freeze_recommendations(grouped)
+        self._ipm_plans = {}
+
+    def __getstate__(self):
+        """Pickle support for the compiled cache (read-only views are unwrapped)"""
+        state = self.__dict__.copy()
+        state["recommendation_index"] = {
+            pest_name: {ctype: [dict(r) for r in recs] for ctype, recs in view.items()}
+            for pest_name, view in self.recommendation_index.items()
+        }
+        del state["_no_recommendations"]
+        state["_batch_matrices"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.recommendation_index = _freeze_recommendations(self.recommendation_index)
+        self._no_recommendations = MappingProxyType({c: () for c in CONTROL_TYPES})
 
     def get_recommendations(self, pest_name):
-        """Get control recommendations for a pest"""
-        recs = {"chemical": [], "biological": [], "cultural": [], "mechanical": []}
+        """Get control recommendations for a pest, sorted by priority
+
+        Returns a shared read-only {control_type: (recommendation, ...)} view.
+        """
+        return self.recommendation_index.get(pest_name, self._no_recommendations)
+
+    def render_ipm_plan(self, pest_name):
+        """Render a pest's IPM control recommendations as text (cached)"""
+        plan = self._ipm_plans.get(pest_name)
+        if plan is None:
+            recs = self.get_recommendations(pest_name)
+            lines = ["", "--- CONTROL RECOMMENDATIONS (IPM Approach) ---"]
+            for control_type in IPM_DISPLAY_ORDER:
+                if recs.get(control_type):
+                    lines.append("")
+                    lines.append(f"[{control_type.upper()} CONTROL]")
+                    for r in recs[control_type]:
+                        lines.append(
+                            f"  Priority {r['priority']}: {r['recommendation']}"
+                        )
+            plan = "\n".join(lines)
+            self._ipm_plans[pest_name] = plan
+        return plan
+
+
+def _freeze_recommendations(grouped):
+    """Wrap {pest: {control_type: [rec dict, ...]}} in shared read-only views"""
+    return {
+        pest_name: MappingProxyType(
+            {
+                ctype: tuple(MappingProxyType(r) for r in recs)
+                for ctype, recs in by_type.items()
+            }
+        )
+        for pest_name, by_type in grouped.items()
+    }
+
+
+def _strongly_connected(graph):
+    """Strongly connected components of {node: successors}, successors first
+
+    Iterative Tarjan: each component (a set) comes after every component it
+    has an edge into, so dependencies are listed before their dependents.
+    """
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, successors = work[-1]
+            for succ in successors:
+                if succ not in index:
+                    index[succ] = low[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(graph.get(succ, ()))))
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def read_knowledge_source(path):
+    """Read knowledge base records from a JSON file, CSV directory or SQLite file
+
+    Returns {"symptoms": [...], "pests": [...], "rules": [...],
+    "recommendations": [...]} with one dict per record. A CSV source is a
+    directory holding symptoms.csv, pests.csv, rules.csv and
+    recommendations.csv; a SQLite source (.db/.sqlite/.sqlite3) holds tables
+    with the same names. In both, a rule's required_symptoms column is a
+    semicolon-separated list.
+    """
+    # The parsers are imported here: a cache hit never needs them, and neither
+    # does an importer that only wants the classes.
+    if os.path.isdir(path):
+        import csv
+
+        data = {}
+        for section in KNOWLEDGE_SECTIONS:
+            section_path = os.path.join(path, f"{section}.csv")
+            with open(section_path, newline="", encoding="utf-8") as f:
+                data[section] = list(csv.DictReader(f))
+    else:
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".json":
+            import json
+
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        if ext not in (".db", ".sqlite", ".sqlite3"):
+            raise ValueError(f"Unsupported knowledge base source: {path}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        import sqlite3
+
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            data = {
+                section: [dict(row) for row in conn.execute(f"SELECT * FROM {section}")]
+                for section in KNOWLEDGE_SECTIONS
+            }
+        finally:
+            conn.close()
+
+    for rec in data["rules"]:
+        rec["required_symptoms"] = [
+            s.strip() for s in rec["required_symptoms"].split(";") if s.strip()
+        ]
+    return data
+
+
+def _source_digest(path):
+    """SHA-256 over the content of a knowledge source, the cache version and
+    the module the pickled classes live in"""
+    # A cache pickled by the script run as __main__ names __main__.KnowledgeBase
+    # and cannot be loaded by importers, so the module is part of the key.
+    key = f"rice-pest-kb-v{KB_CACHE_VERSION}|{KnowledgeBase.__module__}"
+    digest = hashlib.sha256(key.encode())
+    if os.path.isdir(path):
+        files = [os.path.join(path, f"{s}.csv") for s in KNOWLEDGE_SECTIONS]
+    else:
+        files = [path]
+    for file_path in files:
+        with open(file_path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_knowledge_base(path=None, cache_dir=None):
+    """Load a KnowledgeBase, reusing its compiled cache when the source is unchanged
+
+    The first load of a source parses, validates and compiles it, then
+    pickles the result to <cache_dir>/<name>.<content hash>.kbc. Later
+    loads of identical content unpickle that file with no parsing or
+    validation. cache_dir defaults to __pycache__ next to the source;
+    cache_dir=False disables the cache. Cache files are trusted local
+    artifacts, never load them from untrusted locations.
+    """
+    path = os.path.abspath(path or DEFAULT_KNOWLEDGE_FILE)
+    if cache_dir is False:
+        return KnowledgeBase(read_knowledge_source(path))
+
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), "__pycache__")
+    stem = os.path.basename(path)
+    cache_path = os.path.join(cache_dir, f"{stem}.{_source_digest(path)[:20]}.kbc")
+
+    try:
+        with open(cache_path, "rb") as f:
+            kb = pickle.load(f)
+        if type(kb) is KnowledgeBase:
+            return kb
+    except (
+        OSError,
+        EOFError,
+        AttributeError,
+        ImportError,
+        IndexError,
+        KeyError,
+        TypeError,
+        ValueError,
+        pickle.UnpicklingError,
+    ):
+        pass  # missing, unreadable, corrupt or outdated cache: rebuild it below
+
+    kb = KnowledgeBase(read_knowledge_source(path))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(kb, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        for name in os.listdir(cache_dir):
+            if name.startswith(f"{stem}.") and name.endswith(".kbc"):
+                if os.path.join(cache_dir, name) != cache_path:
+                    os.remove(os.path.join(cache_dir, name))
+    except OSError:
+        pass  # caching is best effort, e.g. on a read-only install
+    return kb
 
-        for rec in self.control_recommendations:
-            if rec.pest_name == pest_name:
-                recs[rec.control_type].append(
-                    {"recommendation": rec.recommendation, "priority": rec.priority}
-                )
 
-        for key in recs:
-            recs[key] = sorted(recs[key], key=lambda x: x["priority"])
+class RicePestExpertSystem:
+    """Forward Chaining Expert System for Rice Pest Identification
+
+    Holds the state of one consultation on top of a KnowledgeBase. Pass a
+    shared knowledge_base to avoid rebuilding it for every consultation.
+    Symptom CFs are kept in a flat array indexed by symptom ordinal (ABSENT
+    when not present), so an idle consultation costs a few hundred bytes.
+
+    With incremental=True every set_symptom call re-evaluates only the rules
+    that use the changed symptom and updates identified_pests in place, so
+    forward_chain just reports the current state instead of re-chaining.
+    """
+
+    __slots__ = (
+        "kb",
+        "incremental",
+        "identified_pests",
+        "_cfs",
+        "_rule_cfs",
+        "_pest_evidence",
+    )
+
+    def __init__(self, knowledge_base=None, incremental=False):
+        if knowledge_base is None:
+            knowledge_base = load_knowledge_base()
+        self.kb = knowledge_base
+        if incremental and self.kb.has_intermediate_facts:
+            raise ValueError("Incremental mode does not support intermediate facts")
+        self.incremental = incremental
+        self.identified_pests = {}  # pest_name -> combined CF
+        self._cfs = array("d", self.kb.absent_cfs)  # symptom ordinal -> CF
+        self._rule_cfs = None  # incremental: rule index -> CF of fired rules
+        self._pest_evidence = None  # incremental: pest -> [fired, prod, CF 1 count]
+        if incremental:
+            self._rule_cfs = {}
+            self._pest_evidence = {}
+
+    @property
+    def symptoms(self):
+        return self.kb.symptoms
+
+    @property
+    def pests(self):
+        return self.kb.pests
+
+    @property
+    def rules(self):
+        return self.kb.rules
+
+    @property
+    def control_recommendations(self):
+        return self.kb.control_recommendations
+
+    @property
+    def symptom_names(self):
+        return self.kb.symptom_names
+
+    @property
+    def pest_names(self):
+        return self.kb.pest_names
+
+    @property
+    def observed_symptoms(self):
+        """Names of the symptoms currently present"""
+        names = self.kb.symptom_names
+        return [names[i] for i, cf in enumerate(self._cfs) if cf != ABSENT]
+
+    def reset(self):
+        """Reset the system for a new consultation"""
+        self._cfs[:] = self.kb.absent_cfs
+        self.identified_pests = {}
+        if self.incremental:
+            self._rule_cfs = {}
+            self._pest_evidence = {}
+
+    def set_symptom(self, symptom_name, present=True, cf=0.8):
+        """Set a symptom as present with a certainty factor"""
+        ordinal = self.kb.symptom_ordinals.get(symptom_name)
+        if ordinal is None:
+            return False
+        self._cfs[ordinal] = min(1.0, max(0.0, cf)) if present else ABSENT
+        if self.incremental:
+            self._update_dependent_rules(symptom_name)
+        return True
+
+    def is_present(self, symptom_name):
+        """Whether a symptom is present in this consultation"""
+        ordinal = self.kb.symptom_ordinals.get(symptom_name)
+        return ordinal is not None and self._cfs[ordinal] != ABSENT
+
+    def symptom_cf(self, symptom_name):
+        """Certainty factor of a symptom, 0.0 when it is not present"""
+        ordinal = self.kb.symptom_ordinals.get(symptom_name)
+        if ordinal is None or self._cfs[ordinal] == ABSENT:
+            return 0.0
+        return self._cfs[ordinal]
+
+    def _update_dependent_rules(self, symptom_name):
+        """Re-evaluate only the rules that use symptom_name (incremental mode)"""
+        ordinals = self.kb.symptom_ordinals
+        for idx in self.kb.symptom_rule_index.get(symptom_name, ()):
+            rule = self.rules[idx]
+            old_cf = self._rule_cfs.pop(idx, None)
+            new_cf = None
+
+            symptom_cfs = [
+                self._cfs[ordinals[s]] if s in ordinals else ABSENT
+                for s in rule.required_symptoms
+            ]
+            if ABSENT not in symptom_cfs:
+                new_cf = sum(symptom_cfs) / len(symptom_cfs) * rule.rule_cf
+                self._rule_cfs[idx] = new_cf
+
+            if old_cf == new_cf:
+                continue
+            if old_cf is not None:
+                self._retract_evidence(rule.pest_name, old_cf)
+            if new_cf is not None:
+                self._add_evidence(rule.pest_name, new_cf)
+
+    def _add_evidence(self, pest_name, cf):
+        """Combine one rule's CF into a pest's incremental CF"""
+        evidence = self._pest_evidence.setdefault(pest_name, [0, 1.0, 0])
+        evidence[0] += 1
+        if cf >= 1.0:
+            evidence[2] += 1
+        else:
+            evidence[1] *= 1.0 - cf
+        self._refresh_pest_cf(pest_name, evidence)
+
+    def _retract_evidence(self, pest_name, cf):
+        """Remove one rule's CF from a pest's incremental CF"""
+        evidence = self._pest_evidence[pest_name]
+        evidence[0] -= 1
+        if evidence[0] == 0:
+            del self._pest_evidence[pest_name]
+            del self.identified_pests[pest_name]
+            return
+        if cf >= 1.0:
+            evidence[2] -= 1
+        else:
+            evidence[1] /= 1.0 - cf
+        self._refresh_pest_cf(pest_name, evidence)
+
+    def _refresh_pest_cf(self, pest_name, evidence):
+        """Publish a pest's combined CF
 
-        return recs
+        For non-negative CFs combine_cf folds to 1 - prod(1 - cf_i), which
+        lets a single contribution be divided out again. Rules with CF 1.0
+        are counted separately since their factor is zero.
+        """
+        self.identified_pests[pest_name] = 1.0 if evidence[2] else 1.0 - evidence[1]
+
+    def combine_cf(self, cf1, cf2):
+        """Combine two certainty factors using the standard formula"""
+        return self.kb.combine_cf(cf1, cf2)
+
+    def _observations(self):
+        """Observed symptoms of this consultation as {symptom_name: cf}"""
+        names = self.kb.symptom_names
+        return {names[i]: cf for i, cf in enumerate(self._cfs) if cf != ABSENT}
+
+    def forward_chain(self):
+        """Execute forward chaining inference
+
+        In incremental mode the rules are already up to date, so this only
+        reports the currently fired rules (identified_pests then matches a
+        full chain up to floating-point rounding).
+        """
+        if self.incremental:
+            return [
+                (self.rules[idx].rule_id, self.rules[idx].pest_name, cf)
+                for idx, cf in sorted(self._rule_cfs.items())
+            ]
+        result = self.kb.diagnose(self._observations())
+        self.identified_pests = result.identified_pests
+        return result.fired_rules
+
+    def forward_chain_bitset(self):
+        """Execute forward chaining inference using bitset rule matching"""
+        result = self.kb.diagnose_bitset(self._observations())
+        self.identified_pests = result.identified_pests
+        return result.fired_rules
+
+    def diagnose(self, observations):
+        """Diagnose one case without touching this consultation's state"""
+        return self.kb.diagnose(observations)
+
+    def diagnose_batch(self, symptom_cfs):
+        """Diagnose many cases at once; see KnowledgeBase.diagnose_batch"""
+        return self.kb.diagnose_batch(symptom_cfs)
+
+    def get_recommendations(self, pest_name):
+        """Get control recommendations for a pest"""
+        return self.kb.get_recommendations(pest_name)
+
+    def render_ipm_plan(self, pest_name):
+        """Render a pest's IPM control recommendations as text (cached)"""
+        return self.kb.render_ipm_plan(pest_name)
 
     def display_symptoms_menu(self):
         """Display symptoms organized by pest hint"""
@@ -605,6 +1049,8 @@ class RicePestExpertSystem:
             print("INSTRUCTIONS:")
             print("- Enter symptom numbers separated by commas (e.g., 1,3,5)")
             print("- For each symptom, you'll be asked for confidence level (0-100%)")
+            print("- Prefix with '+' (e.g., +4,7) to add or adjust symptoms of the")
+            print("  previous diagnosis instead of starting a new one")
             print("- Enter 'q' to quit")
             print("-" * 70)
 
@@ -616,6 +1062,10 @@ class RicePestExpertSystem:
                 print("\nThank you for using the Rice Pest Expert System. Goodbye!")
                 break
 
+            amend = user_input.startswith("+")
+            if amend:
+                user_input = user_input[1:]
+
             try:
                 selections = [
                     int(x.strip()) for x in user_input.split(",") if x.strip()
@@ -624,7 +1074,8 @@ class RicePestExpertSystem:
                 print("Invalid input. Please enter numbers separated by commas.")
                 continue
 
-            self.reset()
+            if not amend:
+                self.reset()
             observed = []
 
             for sel in selections:
@@ -659,8 +1110,12 @@ class RicePestExpertSystem:
 
             if fired_rules:
                 print("\nRules Fired:")
-                for rule_id, pest, cf in fired_rules:
-                    print(f"  - {rule_id}: Identified {pest} (CF: {cf:.2%})")
+                for rule_id, conclusion, cf in fired_rules:
+                    if conclusion in self.identified_pests:
+                        verb = "Identified"
+                    else:
+                        verb = "Concluded"
+                    print(f"  - {rule_id}: {verb} {conclusion} (CF: {cf:.2%})")
 
             if self.identified_pests:
                 print("\n" + "=" * 70)
@@ -687,21 +1142,7 @@ class RicePestExpertSystem:
                         print(f"Favorable Conditions: {pest.favorable_conditions}")
                         print(f"Affected Stage: {pest.affected_stage}")
 
-                    print("\n--- CONTROL RECOMMENDATIONS (IPM Approach) ---")
-                    recs = self.get_recommendations(pest_name)
-
-                    for control_type in [
-                        "cultural",
-                        "mechanical",
-                        "biological",
-                        "chemical",
-                    ]:
-                        if recs[control_type]:
-                            print(f"\n[{control_type.upper()} CONTROL]")
-                            for r in recs[control_type]:
-                                print(
-                                    f"  Priority {r['priority']}: {r['recommendation']}"
-                                )
+                    print(self.render_ipm_plan(pest_name))
             else:
                 print("\n" + "-" * 70)
                 print("NO PEST COULD BE IDENTIFIED")
@@ -735,7 +1176,25 @@ def main():
     print("#" + " " * 68 + "#")
     print("#" * 70)
 
-    expert_system = RicePestExpertSystem()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--kb",
+        default=DEFAULT_KNOWLEDGE_FILE,
+        help="Knowledge base source: JSON file, CSV directory or SQLite file.",
+    )
+    args = parser.parse_args()
+
+    # Go through the imported module, not this __main__ copy, so the cache is
+    # pickled with the class paths every other importer of the module uses.
+    import rice_pest_expert_standalone as module
+
+    knowledge_base = module.load_knowledge_base(args.kb)
+    # Incremental updates only cover single-level rule bases
+    expert_system = module.RicePestExpertSystem(
+        knowledge_base, incremental=not knowledge_base.has_intermediate_facts
+    )
     expert_system.run_interactive()
 
 
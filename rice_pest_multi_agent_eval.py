@@ -1,36 +1,39 @@
 """
-Multi-Agent Simulation Evaluator for Rice Pest Expert System (CLIPSpy)
----------------------------------------------------------------------
+Multi-Agent Simulation Evaluator for Rice Pest Expert System
+-----------------------------------------------------------
 Adds:
 - Detailed results table (agent x test case)
 - Summary table (overall)
 - Summary table by agent
 - CSV export
+- Either inference engine (CLIPSpy or the pure-Python standalone one), or
+  both side by side
 
 Run:
   python rice_pest_multi_agent_eval.py
 Optional:
   python rice_pest_multi_agent_eval.py --csv eval_results.csv
+  python rice_pest_multi_agent_eval.py --replicates 1000 --workers 8 --summary-only
+  python rice_pest_multi_agent_eval.py --show-clips-output
+  python rice_pest_multi_agent_eval.py --engine both --replicates 100
 """
 
 from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
+import json
+import os
 import random
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from itertools import islice, tee
 from statistics import mean
 
-# --- Update this import if your main file name is different ---
-try:
-    from rice_pest_expert import RicePestExpertSystem  # change if needed
-except Exception as e:
-    raise ImportError(
-        "Could not import RicePestExpertSystem. Make sure:\n"
-        "1) This evaluator file is in the same folder as your main script.\n"
-        "2) Your main script is named 'rice_pest_expert.py' OR update the import.\n"
-        f"Original import error: {e}"
-    )
-
 
 def clamp(x: float, lo: float = 0.0, hi: float = 1.0) -> float:
     return max(lo, min(hi, x))
@@ -80,18 +83,28 @@ def score_clarity() -> int:
 # -------------------------
 # Agents + Test Cases
 # -------------------------
-def build_agents(seed: int = 42):
-    random.seed(seed)
+def build_agents():
+    # cf_fn draws from the task's own random.Random (see task_rng)
     return [
-        {"name": "A1 Novice Farmer", "cf_fn": lambda: 0.80, "add_noise": False},
-        {"name": "A2 Experienced Farmer", "cf_fn": lambda: clamp(random.uniform(0.85, 0.95)), "add_noise": False},
-        {"name": "A3 Extension Officer", "cf_fn": lambda: clamp(random.uniform(0.70, 0.90)), "add_noise": False},
-        {"name": "A4 Risk-Averse User", "cf_fn": lambda: clamp(random.uniform(0.50, 0.75)), "add_noise": False},
-        {"name": "A5 Noisy/Mixed-Symptoms User", "cf_fn": lambda: clamp(random.uniform(0.60, 0.90)), "add_noise": True},
-        {"name": "A6 Chemical-First User", "cf_fn": lambda: clamp(random.uniform(0.80, 0.90)), "add_noise": False},
+        {"name": "A1 Novice Farmer", "cf_fn": lambda rng: 0.80, "add_noise": False},
+        {"name": "A2 Experienced Farmer", "cf_fn": lambda rng: clamp(rng.uniform(0.85, 0.95)), "add_noise": False},
+        {"name": "A3 Extension Officer", "cf_fn": lambda rng: clamp(rng.uniform(0.70, 0.90)), "add_noise": False},
+        {"name": "A4 Risk-Averse User", "cf_fn": lambda rng: clamp(rng.uniform(0.50, 0.75)), "add_noise": False},
+        {"name": "A5 Noisy/Mixed-Symptoms User", "cf_fn": lambda rng: clamp(rng.uniform(0.60, 0.90)), "add_noise": True},
+        {"name": "A6 Chemical-First User", "cf_fn": lambda rng: clamp(rng.uniform(0.80, 0.90)), "add_noise": False},
     ]
 
 
+def task_rng(seed: int, agent_name: str, test_case_id: str, replicate: int) -> random.Random:
+    """
+    Independent random stream for one (agent, test case, replicate) task.
+    The seed depends only on the task, never on execution order, so serial
+    and parallel runs draw exactly the same numbers.
+    """
+    key = f"{seed}|{agent_name}|{test_case_id}|{replicate}".encode()
+    return random.Random(int.from_bytes(hashlib.sha256(key).digest()[:8], "big"))
+
+
 def build_test_cases():
     # Derived from your rule base + 1 negative case
     return [
@@ -120,10 +133,100 @@ def build_test_cases():
     ]
 
 
+# -------------------------
+# Engine adapters
+# -------------------------
+# Both adapters speak the test cases' CLIPS symptom names (hopper-burn) and
+# return identified pests as [{"name": ..., "cf": ...}, ...], highest CF first.
+# Adapters accept quiet and workers alike; workers applies to the CLIPS one.
+def kb_name(name: str) -> str:
+    # CLIPS symbol (hopper-burn) -> knowledge base symptom name (hopper_burn)
+    return name.replace("-", "_")
+
+
+class StandaloneEngine:
+    """Pure-Python forward chaining from rice_pest_expert_standalone
+
+    Diagnoses run in this process and print nothing: workers is ignored
+    (it sizes the CLIPS process pool) and only quiet=True is supported.
+    """
+
+    name = "standalone"
+
+    def __init__(self, quiet: bool = True, workers: int = 1):
+        from rice_pest_expert_standalone import load_knowledge_base
+
+        if not quiet:
+            raise ValueError("The standalone engine has no diagnosis output to show")
+        self.kb = load_knowledge_base()
+
+    @property
+    def symptom_names(self) -> list[str]:
+        from rice_pest_expert import clips_symptom_name
+
+        return [clips_symptom_name(s) for s in self.kb.symptoms]
+
+    def diagnose(self, observations):
+        for observation in observations:
+            result = self.kb.diagnose({kb_name(s): cf for s, cf in observation.items()})
+            yield [{"name": pest, "cf": cf} for pest, cf in result.ranked_pests()]
+
+    def get_control_recommendations(self, pest_name: str):
+        return self.kb.get_recommendations(pest_name)
+
+
+class ClipsEngine:
+    """CLIPS rules through rice_pest_expert, optionally over worker processes"""
+
+    name = "clips"
+
+    def __init__(self, quiet: bool = True, workers: int = 1):
+        from rice_pest_expert import RicePestExpertSystem
+
+        # quiet: the CLIPS display rules stay off; results come back as data only
+        self.session = RicePestExpertSystem(quiet=quiet)
+        self.workers = workers
+
+    @property
+    def symptom_names(self) -> list[str]:
+        return list(self.session.symptoms_db)
+
+    def diagnose(self, observations):
+        from rice_pest_parallel import ParallelDiagnosisRunner, diagnose_observations
+
+        if self.workers > 1:
+            with ParallelDiagnosisRunner(self.workers) as runner:
+                yield from runner.imap(observations)
+        else:
+            yield from diagnose_observations(self.session, observations)
+
+    def get_control_recommendations(self, pest_name: str):
+        return self.session.get_control_recommendations(pest_name)
+
+
+ENGINES = {"standalone": StandaloneEngine, "clips": ClipsEngine}
+
+
+def timed(iterable, timing: list):
+    # Pass items through, adding [items, seconds spent producing them] to timing
+    it = iter(iterable)
+    clock = time.perf_counter
+    while True:
+        start = clock()
+        try:
+            item = next(it)
+        except StopIteration:
+            timing[1] += clock() - start
+            return
+        timing[0] += 1
+        timing[1] += clock() - start
+        yield item
+
+
 # -------------------------
 # Printing helpers
 # -------------------------
-def print_table(headers, rows):
+def print_table(headers, rows, out=None):
     col_widths = [len(h) for h in headers]
     for row in rows:
         for i, cell in enumerate(row):
@@ -132,168 +235,590 @@ def print_table(headers, rows):
     def fmt_row(r):
         return "  ".join(str(r[i]).ljust(col_widths[i]) for i in range(len(headers)))
 
-    print(fmt_row(headers))
-    print("-" * len(fmt_row(headers)))
+    print(fmt_row(headers), file=out)
+    print("-" * len(fmt_row(headers)), file=out)
     for r in rows:
-        print(fmt_row(r))
+        print(fmt_row(r), file=out)
 
 
 # -------------------------
-# Main simulation
+# Tasks
 # -------------------------
-def run_multi_agent_simulation(seed: int = 42):
-    es = RicePestExpertSystem()
+def iter_tasks(agents, test_cases, replicates: int):
+    # (agent, test case, replicate) in report order, generated lazily
+    for agent in agents:
+        for tc in test_cases:
+            for rep in range(replicates):
+                yield agent, tc, rep
+
+
+def task_observation(task, seed: int, all_symptoms: list[str]) -> dict:
+    agent, tc, replicate = task
+    rng = task_rng(seed, agent["name"], tc["id"], replicate)
+    chosen_symptoms = list(tc["symptoms"])
+
+    # Noisy agent adds one extra random symptom not in the test case
+    if agent["add_noise"]:
+        noise_candidates = [s for s in all_symptoms if s not in chosen_symptoms]
+        if noise_candidates:
+            chosen_symptoms.append(rng.choice(noise_candidates))
+
+    # Agent-specific CF per symptom
+    return {s: agent["cf_fn"](rng) for s in chosen_symptoms}
+
+
+def score_task(es, task, identified: list[dict]) -> dict:
+    agent, tc, replicate = task
+    if identified:
+        top = identified[0]
+        pred_pest = str(top.get("name", ""))
+        pred_cf = float(top.get("cf", 0.0))
+    else:
+        pred_pest = "No pest identified"
+        pred_cf = None
+
+    # Recommendations only if a real pest is identified
+    recs = (
+        es.get_control_recommendations(pred_pest)
+        if pred_pest != "No pest identified"
+        else {"chemical": [], "biological": [], "cultural": [], "mechanical": []}
+    )
+
+    diag_score = score_diagnostic(pred_pest, tc["expected_pest"])
+    cf_score = score_cf_reasonableness(pred_cf, agent["name"])
+    rec_score = score_recommendations(recs)
+    ipm_score = score_ipm_completeness(recs)
+    clarity_score = score_clarity()
+    overall = round(mean([diag_score, cf_score, rec_score, ipm_score, clarity_score]), 2)
+
+    correct = (pred_pest == tc["expected_pest"])
+
+    return {
+        "engine": es.name,
+        "agent": agent["name"],
+        "test_case": tc["id"],
+        "replicate": replicate,
+        "expected": tc["expected_pest"],
+        "predicted": pred_pest,
+        "cf_percent": None if pred_cf is None else round(pred_cf * 100, 1),
+        "overall": overall,
+        "correct": correct,
+    }
 
-    # Optional: if your CLIPS file prints a lot, you can redirect output to file when running:
-    # python rice_pest_multi_agent_eval.py > eval_results.txt
 
-    agents = build_agents(seed=seed)
+# -------------------------
+# Main simulation
+# -------------------------
+def iter_results(
+    seed: int = 42,
+    quiet: bool = True,
+    replicates: int = 1,
+    workers: int = 1,
+    engines=("clips",),
+    timings: dict | None = None,
+    skip: int = 0,
+):
+    """
+    Stream one scored result dict per (engine, agent, test case, replicate)
+    task, engine by engine. Tasks, observations, diagnoses and scores flow
+    through generators, so memory stays flat however many tasks run. Every
+    task draws from its own seeded stream (task_rng), so both engines see
+    the same observations and results are identical for any number of
+    workers. With workers > 1 the CLIPS diagnoses run in a process pool
+    (always quiet). If given, timings[engine] receives [diagnoses, seconds],
+    added to any counts already there. The first skip tasks (see --resume)
+    are passed over without being diagnosed.
+    """
+    agents = build_agents()
     test_cases = build_test_cases()
-    all_symptoms = list(es.symptoms_db.keys())
+    tasks_per_engine = len(agents) * len(test_cases) * replicates
+
+    for engine_name in engines:
+        engine_skip = min(skip, tasks_per_engine)
+        skip -= engine_skip
+        if engine_skip == tasks_per_engine:
+            continue
+        es = ENGINES[engine_name](quiet=quiet, workers=workers)
+        all_symptoms = es.symptom_names
+        timing = [0, 0.0]
+        if timings is not None:
+            timing = timings.setdefault(engine_name, timing)
+
+        # Two views of the same task stream: one feeds the engine, one the
+        # scorer. tee only buffers the tasks whose diagnoses are in flight.
+        remaining = islice(iter_tasks(agents, test_cases, replicates), engine_skip, None)
+        tasks, scored_tasks = tee(remaining)
+        observations = (task_observation(task, seed, all_symptoms) for task in tasks)
+        diagnoses = timed(es.diagnose(observations), timing)
+        for task, identified in zip(scored_tasks, diagnoses):
+            yield score_task(es, task, identified)
+
+
+def run_multi_agent_simulation(seed: int = 42, quiet: bool = True, replicates: int = 1, workers: int = 1, engines=("clips",)):
+    # All results as a list; prefer iter_results for large runs
+    return list(iter_results(seed=seed, quiet=quiet, replicates=replicates, workers=workers, engines=engines))
 
-    results = []
 
-    for agent in agents:
-        for tc in test_cases:
-            es.reset_system()
-            chosen_symptoms = list(tc["symptoms"])
-
-            # Noisy agent adds one extra random symptom not in the test case
-            if agent["add_noise"]:
-                noise_candidates = [s for s in all_symptoms if s not in chosen_symptoms]
-                if noise_candidates:
-                    chosen_symptoms.append(random.choice(noise_candidates))
-
-            # Assert symptoms with agent-specific CF
-            for s in chosen_symptoms:
-                es.assert_symptom(s, present=True, certainty=agent["cf_fn"]())
-
-            es.run_inference()
-
-            identified = es.get_identified_pests()
-            if identified:
-                top = identified[0]
-                pred_pest = str(top.get("name", ""))
-                pred_cf = float(top.get("cf", 0.0))
-            else:
-                pred_pest = "No pest identified"
-                pred_cf = None
-
-            # Recommendations only if a real pest is identified
-            recs = (
-                es.get_control_recommendations(pred_pest)
-                if pred_pest != "No pest identified"
-                else {"chemical": [], "biological": [], "cultural": [], "mechanical": []}
+# -------------------------
+# Running summaries
+# -------------------------
+class SummaryAccumulator:
+    """
+    One-pass running totals behind the summary tables. Overall scores (two
+    decimals) and CF percentages (one decimal) are summed as integers, so
+    the means are exact no matter how many results are added.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.correct = 0
+        self.pest_runs = 0
+        self.pest_correct = 0
+        self.neg_runs = 0
+        self.neg_correct = 0
+        self.overall_centi = 0
+        self.cf_deci = 0
+        self.cf_count = 0
+        # agent -> [runs, correct, overall_centi, cf_deci, cf_count]
+        self.agents = {}
+
+    def add(self, r: dict):
+        overall_centi = round(r["overall"] * 100)
+        self.runs += 1
+        self.correct += r["correct"]
+        self.overall_centi += overall_centi
+
+        agent = self.agents.setdefault(r["agent"], [0, 0, 0, 0, 0])
+        agent[0] += 1
+        agent[1] += r["correct"]
+        agent[2] += overall_centi
+
+        if r["expected"] == "No pest identified":
+            self.neg_runs += 1
+            self.neg_correct += r["correct"]
+        else:
+            self.pest_runs += 1
+            self.pest_correct += r["correct"]
+            if r["cf_percent"] is not None:
+                cf_deci = round(r["cf_percent"] * 10)
+                self.cf_deci += cf_deci
+                self.cf_count += 1
+                agent[3] += cf_deci
+                agent[4] += 1
+
+    def state(self) -> dict:
+        # JSON-ready totals, see from_state
+        return dict(vars(self))
+
+    @classmethod
+    def from_state(cls, state: dict) -> SummaryAccumulator:
+        acc = cls()
+        vars(acc).update(state)
+        return acc
+
+    def summary(self):
+        def pct(part, whole):
+            return round(part / whole * 100, 1) if whole else 0.0
+
+        overall_summary = {
+            "Total runs": self.runs,
+            "Accuracy (all cases) %": pct(self.correct, self.runs),
+            "Accuracy (pest cases only) %": pct(self.pest_correct, self.pest_runs),
+            "Negative-case correctness %": pct(self.neg_correct, self.neg_runs),
+            "Average overall score (1–5)": round(self.overall_centi / self.runs / 100, 2) if self.runs else None,
+            "Average CF % (pest cases)": round(self.cf_deci / self.cf_count / 10, 1) if self.cf_count else None,
+        }
+
+        per_agent = []
+        for a in sorted(self.agents):
+            runs, correct, overall_centi, cf_deci, cf_count = self.agents[a]
+            avg_cf_a = round(cf_deci / cf_count / 10, 1) if cf_count else None
+            per_agent.append((
+                a,
+                runs,
+                pct(correct, runs),
+                "—" if avg_cf_a is None else avg_cf_a,
+                round(overall_centi / runs / 100, 2),
+            ))
+
+        return overall_summary, per_agent
+
+
+# -------------------------
+# SQLite result store
+# -------------------------
+RESULTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    replicates INTEGER NOT NULL,
+    engines TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    test_case TEXT NOT NULL,
+    replicate INTEGER NOT NULL,
+    expected TEXT NOT NULL,
+    predicted TEXT NOT NULL,
+    cf_percent REAL,
+    overall REAL NOT NULL,
+    correct INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results (run_id, engine, agent);
+CREATE INDEX IF NOT EXISTS idx_results_agent ON results (agent, run_id);
+CREATE INDEX IF NOT EXISTS idx_results_test_case ON results (test_case, run_id);
+"""
+
+# The SummaryAccumulator totals of a (run, engine) as SQL aggregates. Scores
+# are summed as integers (centi-points, deci-percent) exactly like add() does.
+_TOTALS_SQL = """
+SELECT {group}
+    COUNT(*),
+    SUM(correct),
+    SUM(expected != 'No pest identified'),
+    SUM(CASE WHEN expected != 'No pest identified' THEN correct ELSE 0 END),
+    SUM(expected = 'No pest identified'),
+    SUM(CASE WHEN expected = 'No pest identified' THEN correct ELSE 0 END),
+    SUM(CAST(ROUND(overall * 100) AS INTEGER)),
+    SUM(CASE WHEN expected != 'No pest identified' AND cf_percent IS NOT NULL
+             THEN CAST(ROUND(cf_percent * 10) AS INTEGER) ELSE 0 END),
+    SUM(expected != 'No pest identified' AND cf_percent IS NOT NULL)
+FROM results WHERE run_id = ? AND engine = ? {group_by}
+"""
+
+
+class ResultStore:
+    """
+    Evaluation results in a local SQLite database, one row per result,
+    tagged with a run id. Rows are buffered and written batch_size at a
+    time with executemany in a single transaction. Summaries are computed
+    by SQL aggregates, so stored runs never have to be loaded into Python.
+    """
+
+    def __init__(self, path: str, batch_size: int = 5000):
+        self.path = path
+        self.batch_size = batch_size
+        self.run_id = None  # set by start_run
+        self._pending = []
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(RESULTS_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start_run(self, seed: int, replicates: int, engines) -> str:
+        self.run_id = uuid.uuid4().hex[:12]
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?)",
+                (
+                    self.run_id,
+                    datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    seed,
+                    replicates,
+                    ",".join(engines),
+                ),
             )
+        return self.run_id
+
+    def add(self, r: dict):
+        self._pending.append((
+            self.run_id, r["engine"], r["agent"], r["test_case"], r["replicate"],
+            r["expected"], r["predicted"], r["cf_percent"], r["overall"], int(r["correct"]),
+        ))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", self._pending
+                )
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def last_rowid(self) -> int:
+        # Highest results rowid written so far (call after flush)
+        return self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM results").fetchone()[0]
+
+    def resume_run(self, run_id: str, last_rowid: int):
+        # Continue run_id, dropping its rows written after last_rowid
+        self.run_engines(run_id)  # raises KeyError for an unknown run
+        self.run_id = run_id
+        with self.conn:
+            self.conn.execute("DELETE FROM results WHERE run_id = ? AND rowid > ?", (run_id, last_rowid))
+
+    def latest_run(self) -> str | None:
+        row = self.conn.execute("SELECT run_id FROM runs ORDER BY started DESC, rowid DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def run_engines(self, run_id: str) -> list[str]:
+        row = self.conn.execute("SELECT engines FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No run {run_id} in {self.path}")
+        return row[0].split(",")
+
+    def accumulator(self, run_id: str, engine: str) -> SummaryAccumulator:
+        # A SummaryAccumulator filled from SQL aggregates instead of add()
+        acc = SummaryAccumulator()
+        totals = self.conn.execute(_TOTALS_SQL.format(group="", group_by=""), (run_id, engine)).fetchone()
+        (acc.runs, acc.correct, acc.pest_runs, acc.pest_correct, acc.neg_runs,
+         acc.neg_correct, acc.overall_centi, acc.cf_deci, acc.cf_count) = (t or 0 for t in totals)
+        per_agent = self.conn.execute(
+            _TOTALS_SQL.format(group="agent,", group_by="GROUP BY agent"), (run_id, engine)
+        )
+        for agent, runs, correct, _, _, _, _, overall_centi, cf_deci, cf_count in per_agent:
+            acc.agents[agent] = [runs, correct, overall_centi, cf_deci, cf_count]
+        return acc
+
+    def run_rows(self):
+        # One row per (run, engine): the columns of the "Stored Runs" table
+        return self.conn.execute("""
+            SELECT r.run_id, r.started, r.seed, r.replicates, s.engine, COUNT(*),
+                   ROUND(100.0 * SUM(s.correct) / COUNT(*), 1),
+                   ROUND(AVG(s.overall), 2)
+            FROM runs r JOIN results s ON s.run_id = r.run_id
+            GROUP BY r.run_id, s.engine
+            ORDER BY r.started, r.run_id, s.engine
+        """).fetchall()
+
 
-            diag_score = score_diagnostic(pred_pest, tc["expected_pest"])
-            cf_score = score_cf_reasonableness(pred_cf, agent["name"])
-            rec_score = score_recommendations(recs)
-            ipm_score = score_ipm_completeness(recs)
-            clarity_score = score_clarity()
-            overall = round(mean([diag_score, cf_score, rec_score, ipm_score, clarity_score]), 2)
-
-            correct = (pred_pest == tc["expected_pest"])
-
-            results.append(
-                {
-                    "agent": agent["name"],
-                    "test_case": tc["id"],
-                    "expected": tc["expected_pest"],
-                    "predicted": pred_pest,
-                    "cf_percent": None if pred_cf is None else round(pred_cf * 100, 1),
-                    "overall": overall,
-                    "correct": correct,
-                }
+# -------------------------
+# Checkpoints
+# -------------------------
+class Checkpoint:
+    """
+    Periodic snapshot of an evaluation in progress, written atomically as
+    JSON. Results arrive in task order, so the completed (engine, agent,
+    test case, replicate) keys are always a prefix of that order: the
+    snapshot stores its length and last key together with the running
+    accumulators, the timings and how far the CSV and the result store had
+    got. --resume restores all of it, passes over the completed tasks and
+    rolls the CSV and the store back to the snapshot.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, config: dict, every: int = 10000):
+        self.path = path
+        self.config = config  # run settings a resume must repeat exactly
+        self.every = every
+        self.completed = 0
+        self.last_key = None
+        self.accumulators = {}  # engine -> SummaryAccumulator
+        self.timings = {}  # engine -> [diagnoses, seconds]
+        self.csv_offset = None  # bytes of CSV covered by the snapshot
+        self.run_id = None
+        self.db_rowid = None
+        self.finished = False
+
+    def load(self):
+        # Restore the snapshot at self.path; the run settings must match
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != self.VERSION:
+            raise ValueError(f"{self.path}: unsupported checkpoint version {state.get('version')}")
+        if state["config"] != self.config:
+            raise ValueError(
+                f"{self.path} was written with {state['config']}, not {self.config}; "
+                "resume with the same options"
             )
+        self.completed = state["completed"]
+        self.last_key = state["last_key"]
+        self.accumulators = {e: SummaryAccumulator.from_state(a) for e, a in state["accumulators"].items()}
+        self.timings = state["timings"]
+        self.csv_offset = state["csv_offset"]
+        self.run_id = state["run_id"]
+        self.db_rowid = state["db_rowid"]
+        self.finished = state["finished"]
+
+    def save(self, last: dict | None, accs: dict, timings: dict | None, csv_file=None, store=None, finished=False):
+        if last is not None:
+            self.last_key = [last["engine"], last["agent"], last["test_case"], last["replicate"]]
+        if csv_file is not None:
+            csv_file.flush()
+            self.csv_offset = csv_file.tell()
+        if store is not None:
+            store.flush()
+            self.run_id = store.run_id
+            self.db_rowid = store.last_rowid()
+        self.finished = finished
+        state = {
+            "version": self.VERSION,
+            "config": self.config,
+            "completed": self.completed,
+            "last_key": self.last_key,
+            "accumulators": {e: acc.state() for e, acc in accs.items()},
+            "timings": timings or {},
+            "csv_offset": self.csv_offset,
+            "run_id": self.run_id,
+            "db_rowid": self.db_rowid,
+            "finished": finished,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+
+def summarize_results(results):
+    acc = SummaryAccumulator()
+    for r in results:
+        acc.add(r)
+    return acc.summary()
 
-    return results
 
+# Fixed column widths (the truncation lengths) so detail rows print as they arrive
+DETAIL_COLUMNS = [("Engine", 10), ("Agent", 26), ("TC", 7), ("Expected", 20), ("Predicted", 22), ("CF%", 5), ("Overall", 7)]
 
-def summarize_results(results: list[dict]):
-    # Overall summary
-    total_runs = len(results)
-    accuracy_all = round(sum(1 for r in results if r["correct"]) / total_runs * 100, 1)
 
-    pest_runs = [r for r in results if r["expected"] != "No pest identified"]
-    neg_runs = [r for r in results if r["expected"] == "No pest identified"]
+def format_detail_row(cells) -> str:
+    return "  ".join(str(c).ljust(w) for c, (_, w) in zip(cells, DETAIL_COLUMNS))
 
-    accuracy_pest = round(sum(1 for r in pest_runs if r["correct"]) / len(pest_runs) * 100, 1) if pest_runs else 0.0
-    accuracy_neg = round(sum(1 for r in neg_runs if r["correct"]) / len(neg_runs) * 100, 1) if neg_runs else 0.0
 
-    avg_overall = round(mean(r["overall"] for r in results), 2)
+def detail_cells(r: dict):
+    cf_txt = "—" if r["cf_percent"] is None else f"{r['cf_percent']:.1f}"
+    return [
+        r["engine"],
+        r["agent"][:26],
+        r["test_case"],
+        r["expected"][:20],
+        r["predicted"][:22],
+        cf_txt,
+        f"{r['overall']:.2f}",
+    ]
 
-    cf_vals = [r["cf_percent"] for r in pest_runs if r["cf_percent"] is not None]
-    avg_cf_pest = round(mean(cf_vals), 1) if cf_vals else None
 
-    overall_summary = {
-        "Total runs": total_runs,
-        "Accuracy (all cases) %": accuracy_all,
-        "Accuracy (pest cases only) %": accuracy_pest,
-        "Negative-case correctness %": accuracy_neg,
-        "Average overall score (1–5)": avg_overall,
-        "Average CF % (pest cases)": avg_cf_pest,
-    }
+CSV_FIELDS = ["engine", "agent", "test_case", "replicate", "expected", "predicted", "cf_percent", "overall", "correct"]
 
-    # Summary by agent
-    agents = sorted(set(r["agent"] for r in results))
-    per_agent = []
-    for a in agents:
-        r_a = [r for r in results if r["agent"] == a]
-        acc_a = round(sum(1 for r in r_a if r["correct"]) / len(r_a) * 100, 1)
 
-        r_a_pest = [r for r in r_a if r["expected"] != "No pest identified"]
-        cf_a_vals = [r["cf_percent"] for r in r_a_pest if r["cf_percent"] is not None]
-        avg_cf_a = round(mean(cf_a_vals), 1) if cf_a_vals else None
+def report_results(results, csv_path: str = "", details: bool = True, out=None, timings: dict | None = None, store: ResultStore | None = None, checkpoint: Checkpoint | None = None):
+    """
+    Consume a result stream once: print each detail row as it arrives,
+    write it to the CSV and the ResultStore, and fold it into its engine's
+    running summary, then print the summary tables, engines side by side.
+    timings is the dict filled by iter_results, read once the stream is
+    exhausted. With a checkpoint, the stream continues from its snapshot
+    (results holds only the missing tasks) and a new snapshot is saved every
+    checkpoint.every results and at the end. Returns {engine: SummaryAccumulator}.
+    """
+    out = out or sys.stdout
+    accs = dict(checkpoint.accumulators) if checkpoint is not None else {}
+
+    print("\n" + "=" * 90, file=out)
+    print("MULTI-AGENT SIMULATION EVALUATION RESULTS", file=out)
+    print("=" * 90, file=out)
+
+    if details:
+        header = format_detail_row([name for name, _ in DETAIL_COLUMNS])
+        print("\nDetailed Results Table (All Runs)", file=out)
+        print(header, file=out)
+        print("-" * len(header), file=out)
+
+    resuming = checkpoint is not None and checkpoint.csv_offset is not None
+    csv_file = None
+    if csv_path and resuming:
+        # Drop rows written after the snapshot, then append
+        csv_file = open(csv_path, "r+", newline="", encoding="utf-8")
+        csv_file.truncate(checkpoint.csv_offset)
+        csv_file.seek(checkpoint.csv_offset)
+    elif csv_path:
+        csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+    last = None
+    try:
+        writer = None
+        if csv_file is not None:
+            writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+            if not resuming:
+                writer.writeheader()
+        for r in results:
+            if details:
+                print(format_detail_row(detail_cells(r)), file=out)
+            if writer is not None:
+                writer.writerow(r)
+            if store is not None:
+                store.add(r)
+            acc = accs.get(r["engine"])
+            if acc is None:
+                acc = accs[r["engine"]] = SummaryAccumulator()
+            acc.add(r)
+            if checkpoint is not None:
+                checkpoint.completed += 1
+                if checkpoint.completed % checkpoint.every == 0:
+                    checkpoint.save(r, accs, timings, csv_file, store)
+                last = r
+        if checkpoint is not None:
+            checkpoint.save(last, accs, timings, csv_file, store, finished=True)
+    finally:
+        if csv_file is not None:
+            csv_file.close()
+        if store is not None:
+            store.flush()
+
+    print_summaries({engine: acc.summary() for engine, acc in accs.items()}, timings, out)
+    return accs
+
+
+def print_summaries(summaries: dict, timings: dict | None = None, out=None):
+    # summaries: {engine: SummaryAccumulator.summary()}, engines side by side
+    out = out or sys.stdout
+    engines = list(summaries)
+
+    # One value column per engine; a single engine keeps the plain "Value" header
+    print("\nSummary Table (Overall)", file=out)
+    summary_headers = ["Metric", *engines] if len(engines) > 1 else ["Metric", "Value"]
+    summary_rows = []
+    for metric in (summaries[engines[0]][0] if engines else {}):
+        values = [summaries[e][0][metric] for e in engines]
+        summary_rows.append((metric, *(v if v is not None else "—" for v in values)))
+    if timings and engines:
+        summary_rows.append(
+            ("Diagnoses per second", *(f"{timings[e][0] / timings[e][1]:.0f}" if timings[e][1] else "—" for e in engines))
+        )
+    print_table(summary_headers, summary_rows, out=out)
 
-        avg_overall_a = round(mean(r["overall"] for r in r_a), 2)
-        per_agent.append((a, len(r_a), acc_a, "—" if avg_cf_a is None else avg_cf_a, avg_overall_a))
+    agent_headers = ["Agent", "Runs", "Accuracy %", "Avg CF % (pest)", "Avg Overall"]
+    for engine in engines:
+        title = f"By Agent, {engine}" if len(engines) > 1 else "By Agent"
+        print(f"\nSummary Table ({title})", file=out)
+        print_table(agent_headers, summaries[engine][1], out=out)
 
-    return overall_summary, per_agent
+    print("\n" + "-" * 90, file=out)
 
 
-def print_results(results: list[dict]):
+def print_stored_run(store: ResultStore, run_id: str):
+    engines = store.run_engines(run_id)  # KeyError before anything is printed
     print("\n" + "=" * 90)
-    print("MULTI-AGENT SIMULATION EVALUATION RESULTS")
+    print(f"STORED RUN {run_id} ({store.path})")
     print("=" * 90)
+    print_summaries({e: store.accumulator(run_id, e).summary() for e in engines})
+
+
+def print_stored_runs(store: ResultStore):
+    print(f"\nStored Runs ({store.path})")
+    headers = ["Run", "Started (UTC)", "Seed", "Replicates", "Engine", "Results", "Accuracy %", "Avg Overall"]
+    print_table(headers, store.run_rows())
 
-    # Detailed table
-    detailed_headers = ["Agent", "TC", "Expected", "Predicted", "CF%", "Overall"]
-    detailed_rows = []
-    for r in results:
-        cf_txt = "—" if r["cf_percent"] is None else f"{r['cf_percent']:.1f}"
-        detailed_rows.append([
-            r["agent"][:26],
-            r["test_case"],
-            r["expected"][:20],
-            r["predicted"][:22],
-            cf_txt,
-            f"{r['overall']:.2f}",
-        ])
-
-    print("\nDetailed Results Table (All Runs)")
-    print_table(detailed_headers, detailed_rows)
-
-    # Summary tables
-    overall_summary, per_agent = summarize_results(results)
-
-    print("\nSummary Table (Overall)")
-    summary_headers = ["Metric", "Value"]
-    summary_rows = [(k, v if v is not None else "—") for k, v in overall_summary.items()]
-    print_table(summary_headers, summary_rows)
-
-    print("\nSummary Table (By Agent)")
-    agent_headers = ["Agent", "Runs", "Accuracy %", "Avg CF % (pest)", "Avg Overall"]
-    agent_rows = [(a, runs, acc, cf, avg) for (a, runs, acc, cf, avg) in per_agent]
-    print_table(agent_headers, agent_rows)
 
-    print("\n" + "-" * 90)
+def print_results(results):
+    report_results(results)
 
 
-def save_csv(results: list[dict], csv_path: str):
-    fields = ["agent", "test_case", "expected", "predicted", "cf_percent", "overall", "correct"]
+def save_csv(results, csv_path: str):
     with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
         writer.writeheader()
         for r in results:
             writer.writerow(r)
@@ -303,14 +828,85 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducibility.")
     parser.add_argument("--csv", type=str, default="", help="Optional: output CSV file path (e.g., eval_results.csv).")
+    parser.add_argument("--show-clips-output", action="store_true", help="Let the CLIPS display rules print each diagnosis.")
+    parser.add_argument("--replicates", type=int, default=1, help="Runs per (agent, test case), each with its own seed.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the CLIPS diagnoses.")
+    parser.add_argument("--engine", choices=["standalone", "clips", "both"], default="clips", help="Inference engine to evaluate; both runs them side by side.")
+    parser.add_argument("--summary-only", action="store_true", help="Skip the per-run detail table.")
+    parser.add_argument("--db", type=str, default="", help="Optional: SQLite file the results are stored in under a new run id.")
+    parser.add_argument("--report-run", type=str, default="", help="With --db: print the summary of a stored run id (or 'latest') from SQL and exit.")
+    parser.add_argument("--list-runs", action="store_true", help="With --db: list the stored runs and exit.")
+    parser.add_argument("--checkpoint", type=str, default="", help="Optional: JSON file the run's progress is saved to periodically.")
+    parser.add_argument("--checkpoint-every", type=int, default=10000, help="Results between checkpoints.")
+    parser.add_argument("--resume", action="store_true", help="Continue the run saved in --checkpoint, skipping completed tasks.")
     args = parser.parse_args()
-
-    results = run_multi_agent_simulation(seed=args.seed)
-    print_results(results)
+    if args.show_clips_output and args.workers > 1:
+        parser.error("--show-clips-output needs --workers 1")
+    if args.engine != "clips" and args.show_clips_output:
+        parser.error("--show-clips-output needs --engine clips")
+    if args.engine == "standalone" and args.workers > 1:
+        parser.error("--workers applies to the CLIPS engine: use --engine clips or both")
+    if (args.report_run or args.list_runs) and not args.db:
+        parser.error("--report-run and --list-runs need --db")
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --checkpoint")
+    if args.checkpoint_every < 1:
+        parser.error("--checkpoint-every must be at least 1")
+
+    if args.report_run or args.list_runs:
+        with ResultStore(args.db) as store:
+            if args.list_runs:
+                print_stored_runs(store)
+            if args.report_run:
+                run_id = store.latest_run() if args.report_run == "latest" else args.report_run
+                if run_id is None:
+                    parser.error(f"No runs stored in {args.db}")
+                try:
+                    print_stored_run(store, run_id)
+                except KeyError as e:
+                    parser.error(e.args[0])
+        return
+
+    engines = ["standalone", "clips"] if args.engine == "both" else [args.engine]
+    checkpoint = None
+    if args.checkpoint:
+        config = {"seed": args.seed, "replicates": args.replicates, "engines": engines, "csv": args.csv, "db": args.db}
+        checkpoint = Checkpoint(args.checkpoint, config, args.checkpoint_every)
+        if args.resume:
+            try:
+                checkpoint.load()
+            except (OSError, ValueError) as e:
+                parser.error(f"Cannot resume: {e}")
+            print(f"Resuming after {checkpoint.completed} completed tasks (last: {checkpoint.last_key})")
+    timings = checkpoint.timings if checkpoint is not None else {}
+    results = iter_results(
+        seed=args.seed,
+        quiet=not args.show_clips_output,
+        replicates=args.replicates,
+        workers=args.workers,
+        engines=engines,
+        timings=timings,
+        skip=checkpoint.completed if checkpoint is not None else 0,
+    )
+    if args.show_clips_output:
+        # Let the CLIPS printout (written below Python's stdout buffer) finish
+        # before the tables start
+        results = list(results)
+    store = ResultStore(args.db) if args.db else None
+    try:
+        if store is not None and checkpoint is not None and checkpoint.run_id is not None:
+            store.resume_run(checkpoint.run_id, checkpoint.db_rowid)
+        elif store is not None:
+            store.start_run(args.seed, args.replicates, engines)
+        report_results(results, csv_path=args.csv, details=not args.summary_only, timings=timings, store=store, checkpoint=checkpoint)
+    finally:
+        if store is not None:
+            store.close()
 
     if args.csv:
-        save_csv(results, args.csv)
         print(f"Saved CSV to: {args.csv}")
+    if store is not None:
+        print(f"Stored run {store.run_id} in: {args.db}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+"""
+Multi-process diagnosis runner for the CLIPS version
+----------------------------------------------------
+A CLIPS environment belongs to one thread, so a single process diagnoses on
+one core. ParallelDiagnosisRunner spreads the work over a pool of worker
+processes. Each worker loads the rule base once at startup and then
+diagnoses chunks of observations in quiet mode; results stream back in input
+order.
+
+Run:
+  python rice_pest_parallel.py cases.jsonl
+Optional:
+  python rice_pest_parallel.py cases.jsonl --workers 8 --chunk-size 128 --out results.jsonl
+
+Each input line is a JSON object mapping symptom names (CLIPS hyphen or
+knowledge base underscore form) to certainty factors 0.0-1.0; each output
+line is the list of identified pests for that case, highest CF first.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from rice_pest_expert import RicePestExpertSystem, clips_symptom_name
+
+# The worker process's session, created once by _init_worker.
+_worker_session = None
+
+
+def _init_worker():
+    """Process pool initializer: one quiet session with the rules loaded"""
+    global _worker_session
+    _worker_session = RicePestExpertSystem(quiet=True)
+    _worker_session.env  # load the rule base now, not on the first chunk
+
+
+def diagnose_observations(session, observations):
+    """Yield session.get_identified_pests() for each {symptom_name: cf}
+
+    This is exactly what a worker runs, so a serial loop over it gives the
+    same results as ParallelDiagnosisRunner.
+    """
+    for observation in observations:
+        symptom_cfs = {clips_symptom_name(k): v for k, v in observation.items()}
+        with session.consultation():
+            session.assert_symptoms(symptom_cfs)
+            session.run_inference()
+            yield session.get_identified_pests()
+
+
+def _diagnose_chunk(chunk):
+    """Diagnose a list of {symptom_name: cf} observations in a worker"""
+    return list(diagnose_observations(_worker_session, chunk))
+
+
+def _chunks(iterable, size):
+    """Split iterable into lists of up to size items, lazily"""
+    it = iter(iterable)
+    chunk = list(islice(it, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(it, size))
+
+
+class ParallelDiagnosisRunner:
+    """Diagnose observations across worker processes with warm CLIPS environments
+
+    Use as a context manager so the worker processes are started once and
+    reused across calls to imap(). Each result is the get_identified_pests()
+    list for one observation. At most max_pending chunks are in flight, so
+    memory stays bounded however long the input is.
+    """
+
+    def __init__(self, workers=None, chunk_size=64, max_pending=None):
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be >= 1, got {chunk_size}")
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending or self.workers * 4
+        self.cases = 0  # observations diagnosed by the last imap()
+        self.elapsed = 0.0  # wall-clock seconds of the last imap()
+        self._executor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        """Start the worker processes (imap() does this on first use)"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker
+            )
+
+    def close(self):
+        """Shut the worker processes down"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @property
+    def throughput(self):
+        """Observations per second of the last imap()"""
+        return self.cases / self.elapsed if self.elapsed else 0.0
+
+    def imap(self, observations):
+        """Yield the identified pests of each observation, in input order"""
+        self.start()
+        self.cases = 0
+        start = time.perf_counter()
+        pending = deque()
+        for chunk in _chunks(observations, self.chunk_size):
+            pending.append(self._executor.submit(_diagnose_chunk, chunk))
+            if len(pending) >= self.max_pending:
+                yield from self._collect(pending.popleft(), start)
+        while pending:
+            yield from self._collect(pending.popleft(), start)
+
+    def _collect(self, future, start):
+        """Results of one finished chunk, updating the throughput counters"""
+        results = future.result()
+        self.cases += len(results)
+        self.elapsed = time.perf_counter() - start
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cases", help="JSON lines file, one {symptom: cf} object per line.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Observations per task sent to a worker.")
+    parser.add_argument("--out", type=str, default="", help="Output JSON lines file (default: stdout).")
+    args = parser.parse_args()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        with open(args.cases, encoding="utf-8") as f:
+            observations = (json.loads(line) for line in f if line.strip())
+            with ParallelDiagnosisRunner(args.workers, args.chunk_size) as runner:
+                for pests in runner.imap(observations):
+                    out.write(json.dumps(pests) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(
+        f"{runner.cases} cases in {runner.elapsed:.2f}s with {runner.workers} "
+        f"workers: {runner.throughput:.0f} cases/s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
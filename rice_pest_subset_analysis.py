@@ -0,0 +1,403 @@
+"""
+Exhaustive symptom-subset analysis for the standalone rule base
+---------------------------------------------------------------
+Maps the whole diagnosis space: every subset of the knowledge base symptoms
+(2^25, about 33.5M, for the shipped file), or every subset of up to
+--max-size symptoms, is diagnosed as a bitmask. A pest is identified when
+one of its rules' symptom masks is contained in the subset; CF values do not
+matter for that. Subsets are counted as:
+
+- no pest: no rule fires
+- multiple pests: rules of two or more pests fire
+- hint mismatch: a pest is identified, but none of the pests that most of
+  the subset's symptoms hint at (the symptoms' pest_hint) is among them
+
+The rules are compiled to bit masks once. Subsets are enumerated in NumPy
+blocks that share their high bits (the prefix), or, when --max-size leaves
+only a small part of the 2^n subsets, built directly by leading (lowest)
+symptom. The blocks are spread over worker processes. Requires NumPy.
+
+Run:
+  python rice_pest_subset_analysis.py
+Optional:
+  python rice_pest_subset_analysis.py --max-size 6 --workers 8 --out subsets.json
+  python rice_pest_subset_analysis.py --masks ambiguous_masks.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+from rice_pest_expert_standalone import load_knowledge_base
+
+# Subsets per NumPy block (2^BLOCK_BITS): the low bits vary within a block,
+# the high bits are the block's prefix.
+BLOCK_BITS = 20
+
+
+def popcount(a):
+    """Set bits of each element (np.bitwise_count where NumPy has it, >= 2.0)"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(a)
+    bits = np.unpackbits(a.astype(np.uint64).view(np.uint8).reshape(-1, 8), axis=1)
+    return bits.sum(axis=1, dtype=np.uint8)
+
+
+def compile_bitmask_rules(kb):
+    """The rule base as plain masks, small enough to hand to every worker
+
+    Observed symptoms take the low bits (kb.symptom_bits order); intermediate
+    facts, required or only concluded, get the bits above them. Returns a
+    dict with the symptom and pest names, the pest rules as (symptom mask,
+    pest index) pairs, the intermediate-fact rules as (mask, fact bit) pairs
+    in derivation order and each pest's pest_hint symptom mask.
+    """
+    n_symptoms = len(kb.symptoms)
+    bits = dict(kb.symptom_bits)
+    for rule in kb.rules:
+        if rule.concludes is not None and rule.concludes not in bits:
+            bits[rule.concludes] = 1 << len(bits)  # concluded, never required
+    if n_symptoms > 62 or len(bits) > 64:
+        raise ValueError(
+            f"{n_symptoms} symptoms and {len(bits) - n_symptoms} other facts do not "
+            f"fit a 64-bit subset mask (at most 62 symptoms and 64 bits in all)"
+        )
+    pests = list(kb.pest_names)
+    if len(pests) > 64:
+        raise ValueError(f"{len(pests)} pests do not fit a 64-bit pest set")
+    pest_index = {name: i for i, name in enumerate(pests)}
+    strata = {id(rule): stratum for rule, stratum in zip(kb.rules, kb.rule_strata)}
+    pest_rules = []
+    fact_rules = []
+    for mask, rule in kb.rule_masks:
+        if rule.concludes is None:
+            pest_rules.append((mask, pest_index[rule.pest_name]))
+        else:
+            fact_rules.append((strata[id(rule)], mask, bits[rule.concludes]))
+    fact_rules.sort(key=lambda r: r[0])
+
+    hint_masks = [0] * len(pests)
+    for name, symptom in kb.symptoms.items():
+        if symptom.pest_hint in pest_index:
+            hint_masks[pest_index[symptom.pest_hint]] |= kb.symptom_bits[name]
+
+    return {
+        "symptoms": list(kb.symptoms),
+        "pests": pests,
+        "pest_rules": pest_rules,
+        "fact_rules": [(mask, bit) for _, mask, bit in fact_rules],
+        "hint_masks": hint_masks,
+    }
+
+
+def identify(masks, compiled):
+    """Bit set of the pests identified by each subset mask (uint64 array)"""
+    state = masks
+    if compiled["fact_rules"]:
+        # Derive intermediate facts until nothing changes (at most one pass
+        # per fact rule, as in the agenda's cycle cut-off)
+        state = masks.copy()
+        for _ in compiled["fact_rules"]:
+            before = state.copy()
+            for mask, bit in compiled["fact_rules"]:
+                mask = np.uint64(mask)
+                state[(state & mask) == mask] |= np.uint64(bit)
+            if np.array_equal(before, state):
+                break
+    pest_sets = np.zeros(masks.shape, dtype=np.uint64)
+    for mask, pest in compiled["pest_rules"]:
+        mask = np.uint64(mask)
+        pest_sets[(state & mask) == mask] |= np.uint64(1 << pest)
+    return pest_sets
+
+
+def hinted_pests(masks, compiled):
+    """Bit set of the pests hinted at by the most symptoms of each subset"""
+    counts = np.stack(
+        [popcount(masks & np.uint64(h)) for h in compiled["hint_masks"]]
+    )
+    top = counts.max(axis=0)
+    hinted = np.zeros(masks.shape, dtype=np.uint64)
+    for pest, pest_counts in enumerate(counts):
+        hinted[(pest_counts == top) & (top > 0)] |= np.uint64(1 << pest)
+    return hinted
+
+
+def analyse_masks(masks, compiled, keep_masks=False):
+    """Histograms (and optionally the ambiguous masks) of one block of subsets"""
+    n_symptoms = len(compiled["symptoms"])
+    sizes = popcount(masks).astype(np.intp)
+    pest_sets = identify(masks, compiled)
+    n_pests = popcount(pest_sets)
+    hinted = hinted_pests(masks, compiled)
+
+    no_pest = n_pests == 0
+    multiple = n_pests > 1
+    mismatch = ~no_pest & ((pest_sets & hinted) == 0)
+
+    def by_size(selected):
+        return np.bincount(sizes[selected], minlength=n_symptoms + 1)
+
+    # Only the pest sets that occur are counted: 2^pests bins do not scale
+    pest_set_values, pest_set_counts = np.unique(pest_sets, return_counts=True)
+
+    result = {
+        "subsets": np.bincount(sizes, minlength=n_symptoms + 1),
+        "no_pest": by_size(no_pest),
+        "multiple_pests": by_size(multiple),
+        "hint_mismatch": by_size(mismatch),
+        "pest_sets": Counter(dict(zip(pest_set_values.tolist(), pest_set_counts.tolist()))),
+    }
+    if keep_masks:
+        result["multiple_pests_masks"] = masks[multiple]
+        result["hint_mismatch_masks"] = masks[mismatch]
+    return result
+
+
+def prefix_masks(prefix, n_symptoms, max_size):
+    """All subset masks with the given high bits, up to max_size symptoms"""
+    low_bits = min(BLOCK_BITS, n_symptoms)
+    masks = (np.uint64(prefix) << np.uint64(low_bits)) | np.arange(
+        1 << low_bits, dtype=np.uint64
+    )
+    if max_size < n_symptoms:
+        masks = masks[popcount(masks) <= max_size]
+    return masks
+
+
+def leading_symptom_masks(first, n_symptoms, max_size):
+    """All subset masks whose lowest symptom is first, up to max_size symptoms
+
+    Built a size at a time: every subset grows by each symptom above its
+    highest one.
+    """
+    masks = np.array([1 << first], dtype=np.uint64)
+    highest = np.array([first], dtype=np.intp)
+    levels = [masks]
+    for _ in range(1, min(max_size, n_symptoms - first)):
+        grown = [(b, masks[highest < b]) for b in range(first + 1, n_symptoms)]
+        masks = np.concatenate([m | np.uint64(1 << b) for b, m in grown])
+        highest = np.concatenate([np.full(len(m), b, dtype=np.intp) for b, m in grown])
+        levels.append(masks)
+    return np.concatenate(levels)
+
+
+def small_subset_masks(n_symptoms, max_size):
+    """All subset masks of up to max_size symptoms, built directly"""
+    masks = [np.zeros(1, dtype=np.uint64)]
+    if max_size > 0:
+        masks += [leading_symptom_masks(b, n_symptoms, max_size) for b in range(n_symptoms)]
+    return np.concatenate(masks)
+
+
+# The worker process's compiled rule base, set once by _init_worker.
+_compiled = None
+
+
+def _init_worker(compiled):
+    global _compiled
+    _compiled = compiled
+
+
+def _analyse_block(job):
+    # job: ("prefix", high bits, ...) or ("leading", lowest symptom, ...)
+    kind, start, max_size, keep_masks = job
+    n_symptoms = len(_compiled["symptoms"])
+    if kind == "prefix":
+        masks = prefix_masks(start, n_symptoms, max_size)
+    else:
+        masks = leading_symptom_masks(start, n_symptoms, max_size)
+    return analyse_masks(masks, _compiled, keep_masks)
+
+
+def _merge(total, part):
+    # Histograms are added up; mask arrays are collected for _concatenate_masks
+    if total is None:
+        total = {}
+    for key, value in part.items():
+        if key.endswith("_masks"):
+            total.setdefault(key, []).append(value)
+        elif key in total:
+            total[key] += value
+        else:
+            total[key] = value
+    return total
+
+
+def _concatenate_masks(total):
+    for key, value in total.items():
+        if key.endswith("_masks"):
+            total[key] = np.concatenate(value)
+    return total
+
+
+def enumerate_subsets(compiled, max_size=None, workers=None, keep_masks=False):
+    """Histograms over every subset of up to max_size symptoms (default: all)
+
+    Large enumerations are split over worker processes: by prefix when
+    most of the 2^n subsets qualify, otherwise by leading symptom, so only
+    the wanted subsets are ever built. When few subsets qualify at all they
+    are listed directly in this process.
+    """
+    n_symptoms = len(compiled["symptoms"])
+    max_size = n_symptoms if max_size is None else min(max_size, n_symptoms)
+    low_bits = min(BLOCK_BITS, n_symptoms)
+    wanted = sum(comb(n_symptoms, k) for k in range(max_size + 1))
+
+    if wanted <= (1 << low_bits) // 4:
+        return analyse_masks(small_subset_masks(n_symptoms, max_size), compiled, keep_masks)
+
+    if wanted * 8 <= 1 << n_symptoms:
+        # The empty subset here, every other one under its lowest symptom
+        total = _merge(None, analyse_masks(np.zeros(1, dtype=np.uint64), compiled, keep_masks))
+        jobs = [("leading", first, max_size, keep_masks) for first in range(n_symptoms)]
+    else:
+        total = None
+        prefixes = 1 << (n_symptoms - low_bits)
+        jobs = [("prefix", prefix, max_size, keep_masks) for prefix in range(prefixes)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(compiled)
+        for job in jobs:
+            total = _merge(total, _analyse_block(job))
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(compiled,)) as pool:
+            for part in pool.map(_analyse_block, jobs):
+                total = _merge(total, part)
+    return _concatenate_masks(total)
+
+
+def minimal_multiple_pest_masks(compiled):
+    """Smallest symptom sets that identify more than one pest
+
+    Identification only grows with the subset, so every multiple-pest subset
+    contains one of these: they describe the whole category compactly.
+    Single-level rule bases only (returns None with intermediate facts).
+    """
+    if compiled["fact_rules"]:
+        return None
+    by_pest = {}
+    for mask, pest in compiled["pest_rules"]:
+        by_pest.setdefault(pest, []).append(mask)
+    candidates = set()
+    for (p, masks_p), (q, masks_q) in combinations(sorted(by_pest.items()), 2):
+        for a in masks_p:
+            for b in masks_q:
+                candidates.add(a | b)
+    return sorted(
+        (m for m in candidates if not any(o != m and o & m == o for o in candidates)),
+        key=lambda m: (bin(m).count("1"), m),
+    )
+
+
+def describe_mask(mask, compiled):
+    symptoms = compiled["symptoms"]
+    return [symptoms[i] for i in range(len(symptoms)) if mask >> i & 1]
+
+
+def pest_set_name(pest_set, compiled):
+    names = [p for i, p in enumerate(compiled["pests"]) if pest_set >> i & 1]
+    return " + ".join(names) if names else "(none)"
+
+
+def build_report(compiled, totals, max_size, seconds, workers):
+    n_symptoms = len(compiled["symptoms"])
+    sizes = range(n_symptoms + 1 if max_size is None else min(max_size, n_symptoms) + 1)
+    by_size = [
+        {
+            "size": k,
+            "subsets": int(totals["subsets"][k]),
+            "no_pest": int(totals["no_pest"][k]),
+            "multiple_pests": int(totals["multiple_pests"][k]),
+            "hint_mismatch": int(totals["hint_mismatch"][k]),
+        }
+        for k in sizes
+    ]
+    pest_sets = {
+        pest_set_name(s, compiled): int(count)
+        for s, count in totals["pest_sets"].items()
+    }
+    minimal = minimal_multiple_pest_masks(compiled)
+    return {
+        "symptoms": compiled["symptoms"],
+        "pests": compiled["pests"],
+        "max_size": max_size,
+        "seconds": round(seconds, 2),
+        "workers": workers,
+        "subsets": int(totals["subsets"].sum()),
+        "no_pest": int(totals["no_pest"].sum()),
+        "multiple_pests": int(totals["multiple_pests"].sum()),
+        "hint_mismatch": int(totals["hint_mismatch"].sum()),
+        "by_size": by_size,
+        "by_pest_set": dict(sorted(pest_sets.items(), key=lambda x: -x[1])),
+        "minimal_multiple_pest_masks": None if minimal is None else [
+            {"mask": m, "symptoms": describe_mask(m, compiled)} for m in minimal
+        ],
+    }
+
+
+def print_report(report):
+    from rice_pest_multi_agent_eval import print_table
+
+    print("\n=== SYMPTOM SUBSETS (%d symptoms, %d subsets, %.1fs) ===" % (
+        len(report["symptoms"]), report["subsets"], report["seconds"]))
+    rows = [
+        [r["size"], r["subsets"], r["no_pest"], r["multiple_pests"], r["hint_mismatch"]]
+        for r in report["by_size"]
+    ]
+    rows.append(["all", report["subsets"], report["no_pest"], report["multiple_pests"], report["hint_mismatch"]])
+    print_table(["Size", "Subsets", "No pest", "Multiple pests", "Hint mismatch"], rows)
+
+    print("\nIdentified pest sets")
+    print_table(["Pests", "Subsets"], list(report["by_pest_set"].items()))
+
+    minimal = report["minimal_multiple_pest_masks"]
+    if minimal is not None:
+        print(f"\nMinimal multiple-pest symptom sets ({len(minimal)})")
+        print_table(["Mask", "Symptoms"], [[m["mask"], ", ".join(m["symptoms"])] for m in minimal[:20]])
+        if len(minimal) > 20:
+            print(f"... {len(minimal) - 20} more in the JSON report")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-size", type=int, default=None, help="Only subsets of up to this many symptoms (default: all).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--knowledge", type=str, default=None, help="Knowledge base source (default: rice_pest_knowledge_base.json).")
+    parser.add_argument("--out", type=str, default="subset_analysis.json", help="JSON report file.")
+    parser.add_argument("--masks", type=str, default="", help="Optional: .npz file for every multiple-pest and hint-mismatch mask.")
+    args = parser.parse_args()
+
+    compiled = compile_bitmask_rules(load_knowledge_base(args.knowledge))
+    workers = args.workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    totals = enumerate_subsets(compiled, args.max_size, workers, keep_masks=bool(args.masks))
+    seconds = time.perf_counter() - start
+
+    report = build_report(compiled, totals, args.max_size, seconds, workers)
+    print_report(report)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to: {args.out}")
+    if args.masks:
+        np.savez_compressed(
+            args.masks,
+            symptoms=np.array(compiled["symptoms"]),
+            multiple_pests=np.sort(totals["multiple_pests_masks"]),
+            hint_mismatch=np.sort(totals["hint_mismatch_masks"]),
+        )
+        print(f"Masks saved to: {args.masks}")
+
+
+if __name__ == "__main__":
+    main()
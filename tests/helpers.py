@@ -0,0 +1,38 @@
+"""Small knowledge bases for the tests"""
+
+from rice_pest_expert_standalone import KnowledgeBase
+
+
+def knowledge(n_symptoms, n_pests, rules):
+    """Knowledge base records: symptoms s0.., pests P0.., rules as given"""
+    return KnowledgeBase(
+        {
+            "symptoms": [
+                {"name": f"s{i}", "description": f"s{i}", "pest_hint": f"P{i % n_pests}"}
+                for i in range(n_symptoms)
+            ],
+            "pests": [
+                {
+                    "name": f"P{i}",
+                    "scientific_name": f"P{i}",
+                    "description": "",
+                    "damage_type": "",
+                    "favorable_conditions": "",
+                    "affected_stage": "",
+                }
+                for i in range(n_pests)
+            ],
+            "rules": rules,
+            "recommendations": [],
+        }
+    )
+
+
+def rule(rule_id, symptoms, pest=None, concludes=None, cf=0.9):
+    """One rule record concluding pest, or the intermediate fact concludes"""
+    record = {"rule_id": rule_id, "required_symptoms": symptoms, "rule_cf": cf}
+    if concludes is None:
+        record["pest_name"] = pest
+    else:
+        record["concludes"] = concludes
+    return record
@@ -0,0 +1,151 @@
+import csv
+import glob
+import json
+import os
+import pickle
+import sqlite3
+import sys
+
+import pytest
+
+import rice_pest_expert_standalone as standalone
+from rice_pest_expert_standalone import (
+    DEFAULT_KNOWLEDGE_FILE,
+    KNOWLEDGE_SECTIONS,
+    KnowledgeBase,
+    load_knowledge_base,
+)
+
+
+@pytest.fixture(scope="module")
+def records():
+    with open(DEFAULT_KNOWLEDGE_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def table_rows(records, section):
+    # Records as flat rows: required_symptoms becomes a ;-separated string
+    rows = [dict(rec) for rec in records[section]]
+    for row in rows:
+        if "required_symptoms" in row:
+            row["required_symptoms"] = ";".join(row["required_symptoms"])
+    fields = list(dict.fromkeys(key for row in rows for key in row))
+    return fields, rows
+
+
+def knowledge_summary(kb):
+    return (
+        sorted(kb.symptoms),
+        sorted(kb.pests),
+        [(r.rule_id, r.pest_name, r.required_symptoms, r.rule_cf, r.concludes) for r in kb.rules],
+        {p: kb.get_recommendations(p)["chemical"] for p in kb.pests},
+        kb.diagnose({"hopper_burn": 0.9, "yellowing_drying": 0.8}).identified_pests,
+    )
+
+
+def test_csv_source(tmp_path, records):
+    for section in KNOWLEDGE_SECTIONS:
+        fields, rows = table_rows(records, section)
+        with open(tmp_path / f"{section}.csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    kb = load_knowledge_base(str(tmp_path), cache_dir=False)
+    assert knowledge_summary(kb) == knowledge_summary(KnowledgeBase(records))
+
+
+def test_sqlite_source(tmp_path, records):
+    db_path = tmp_path / "kb.sqlite"
+    with sqlite3.connect(db_path) as conn:
+        for section in KNOWLEDGE_SECTIONS:
+            fields, rows = table_rows(records, section)
+            conn.execute(f"CREATE TABLE {section} ({', '.join(fields)})")
+            conn.executemany(
+                f"INSERT INTO {section} VALUES ({', '.join('?' * len(fields))})",
+                [[row.get(k) for k in fields] for row in rows],
+            )
+    conn.close()
+    kb = load_knowledge_base(str(db_path), cache_dir=False)
+    assert knowledge_summary(kb) == knowledge_summary(KnowledgeBase(records))
+
+
+@pytest.fixture
+def source(tmp_path, records):
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps(records), encoding="utf-8")
+    return path
+
+
+def cache_files(cache_dir):
+    return glob.glob(os.path.join(cache_dir, "*.kbc"))
+
+
+def test_cache_hit_skips_parsing(tmp_path, source, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    first = load_knowledge_base(str(source), cache_dir)
+    assert len(cache_files(cache_dir)) == 1
+
+    def no_parsing(path):
+        raise AssertionError("cache was not used")
+
+    monkeypatch.setattr(standalone, "read_knowledge_source", no_parsing)
+    cached = load_knowledge_base(str(source), cache_dir)
+    assert cached is not first
+    assert knowledge_summary(cached) == knowledge_summary(first)
+
+
+def test_cache_rebuilt_after_source_change(tmp_path, source, records):
+    cache_dir = str(tmp_path / "cache")
+    load_knowledge_base(str(source), cache_dir)
+    (old_cache,) = cache_files(cache_dir)
+
+    changed = json.loads(json.dumps(records))
+    changed["rules"][0]["rule_cf"] = 0.5
+    source.write_text(json.dumps(changed), encoding="utf-8")
+    kb = load_knowledge_base(str(source), cache_dir)
+    assert kb.rules[0].rule_cf == 0.5
+    (new_cache,) = cache_files(cache_dir)  # the stale one is removed
+    assert new_cache != old_cache
+
+
+def test_main_module_pickle_rejected(tmp_path, source, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    load_knowledge_base(str(source), cache_dir)
+    (cache_path,) = cache_files(cache_dir)
+    importer_digest = standalone._source_digest(str(source))
+
+    # What the script run as __main__ pickles: __main__.KnowledgeBase
+    kb = KnowledgeBase(json.loads(source.read_text(encoding="utf-8")))
+    with monkeypatch.context() as m:
+        m.setattr(KnowledgeBase, "__module__", "__main__")
+        m.setattr(sys.modules["__main__"], "KnowledgeBase", KnowledgeBase, raising=False)
+        assert standalone._source_digest(str(source)) != importer_digest
+        main_pickle = pickle.dumps(kb, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(cache_path, "wb") as f:
+        f.write(main_pickle)
+
+    loaded = load_knowledge_base(str(source), cache_dir)
+    assert type(loaded) is KnowledgeBase
+    with open(cache_path, "rb") as f:
+        assert f.read() != main_pickle  # rebuilt
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"\x80\x7f",  # unsupported pickle protocol: ValueError
+        b"cno_such_module_for_kbc\nThing\n.",  # ImportError
+        b"\x80\x05garbage",
+        b"",
+    ],
+)
+def test_bad_cache_is_rebuilt(tmp_path, source, content):
+    cache_dir = str(tmp_path / "cache")
+    load_knowledge_base(str(source), cache_dir)
+    (cache_path,) = cache_files(cache_dir)
+    with open(cache_path, "wb") as f:
+        f.write(content)
+    kb = load_knowledge_base(str(source), cache_dir)
+    assert type(kb) is KnowledgeBase
+    with open(cache_path, "rb") as f:
+        assert pickle.load(f).rule_strata == kb.rule_strata
@@ -0,0 +1,81 @@
+import io
+import sqlite3
+
+import pytest
+
+from rice_pest_multi_agent_eval import Checkpoint, ResultStore, iter_results, report_results
+
+CONFIG = {"seed": 7, "replicates": 2, "engines": ["standalone"]}
+
+
+def stored_rows(db_path):
+    # Every stored result without its run id, in insertion order
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT engine, agent, test_case, replicate, expected, predicted, cf_percent, overall, correct "
+            "FROM results ORDER BY rowid"
+        ).fetchall()
+
+
+def run(tmp_path, name, checkpoint=None, stop_after=None):
+    # One report_results pass over the remaining tasks, killed after stop_after results
+    csv_path, db_path = tmp_path / f"{name}.csv", tmp_path / f"{name}.db"
+    timings = checkpoint.timings if checkpoint is not None else {}
+    results = iter_results(
+        seed=CONFIG["seed"],
+        replicates=CONFIG["replicates"],
+        engines=CONFIG["engines"],
+        timings=timings,
+        skip=checkpoint.completed if checkpoint is not None else 0,
+    )
+    if stop_after is not None:
+        results = killed_after(results, stop_after)
+    with ResultStore(str(db_path), batch_size=4) as store:
+        if checkpoint is not None and checkpoint.run_id is not None:
+            store.resume_run(checkpoint.run_id, checkpoint.db_rowid)
+        else:
+            store.start_run(CONFIG["seed"], CONFIG["replicates"], CONFIG["engines"])
+        accs = report_results(
+            results, csv_path=str(csv_path), out=io.StringIO(), timings=timings,
+            store=store, checkpoint=checkpoint,
+        )
+    return csv_path, db_path, accs
+
+
+def killed_after(results, count):
+    for i, r in enumerate(results):
+        if i == count:
+            raise KeyboardInterrupt
+        yield r
+
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path):
+    csv_full, db_full, accs_full = run(tmp_path, "full")
+
+    path = str(tmp_path / "run.ckpt")
+    with pytest.raises(KeyboardInterrupt):
+        run(tmp_path, "resumed", Checkpoint(path, CONFIG, every=10), stop_after=37)
+    checkpoint = Checkpoint(path, CONFIG, every=10)
+    checkpoint.load()
+    assert checkpoint.completed == 30 and not checkpoint.finished
+    csv_resumed, db_resumed, accs_resumed = run(tmp_path, "resumed", checkpoint)
+
+    assert csv_resumed.read_bytes() == csv_full.read_bytes()
+    assert {e: a.state() for e, a in accs_resumed.items()} == {e: a.state() for e, a in accs_full.items()}
+    assert stored_rows(db_resumed) == stored_rows(db_full)
+    finished = Checkpoint(path, CONFIG)
+    finished.load()
+    assert finished.finished and finished.completed == len(stored_rows(db_full))
+
+
+def test_checkpoint_rejects_other_settings(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    Checkpoint(path, CONFIG).save(None, {}, {})
+    with pytest.raises(ValueError, match="same options"):
+        Checkpoint(path, dict(CONFIG, seed=8)).load()
+
+
+def test_both_engines_with_clips_workers():
+    pytest.importorskip("clips")
+    kwargs = dict(seed=3, replicates=1, engines=("standalone", "clips"))
+    assert list(iter_results(workers=2, **kwargs)) == list(iter_results(workers=1, **kwargs))
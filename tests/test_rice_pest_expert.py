@@ -0,0 +1,143 @@
+import gc
+import random
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("clips")
+
+from rice_pest_expert import EnvironmentPool, RicePestExpertSystem, clips_symptom_name
+from rice_pest_expert_standalone import load_knowledge_base
+
+
+@pytest.fixture(scope="module")
+def kb():
+    return load_knowledge_base()
+
+
+def random_cases(kb, count, seed=0):
+    names = [clips_symptom_name(s) for s in kb.symptoms]
+    rng = random.Random(seed)
+    return [
+        {s: round(rng.uniform(0.2, 1.0), 2) for s in rng.sample(names, rng.randint(2, 8))}
+        for _ in range(count)
+    ]
+
+
+def standalone_pests(kb, case):
+    observations = {s.replace("-", "_"): cf for s, cf in case.items()}
+    return kb.diagnose(observations).identified_pests
+
+
+def clips_pests(session, case):
+    return {p["name"]: p["cf"] for p in session.diagnose(case)}
+
+
+def test_pooled_session_shared_by_threads(kb, capfd):
+    cases = random_cases(kb, 400)
+    expected = [standalone_pests(kb, case) for case in cases]
+    session = RicePestExpertSystem(kb, pool=EnvironmentPool(min_size=2, max_size=4), quiet=True)
+    failures = []
+
+    def work(indices):
+        for i in indices:
+            try:
+                got = clips_pests(session, cases[i])
+                if got.keys() != expected[i].keys() or any(
+                    got[p] != pytest.approx(expected[i][p]) for p in got
+                ):
+                    failures.append((i, got, expected[i]))
+            except Exception as e:  # noqa: BLE001 - collected for the assert
+                failures.append((i, repr(e)))
+
+    threads = [threading.Thread(target=work, args=(range(t, len(cases), 4),)) for t in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert failures == []
+    assert session.pool.idle == session.pool.size
+    assert capfd.readouterr().out == ""  # quiet: the display rule never fired
+
+
+def test_pooled_environment_rotates_without_consultation(kb):
+    pool = EnvironmentPool(min_size=1, max_size=1, max_uses=3)
+    session = RicePestExpertSystem(kb, pool=pool, quiet=True)
+    seen = []
+    for _ in range(7):
+        session.reset_system()  # checked out throughout, never released
+        seen.append(session.env)
+    assert seen[0] is seen[1] is seen[2]
+    assert seen[3] is not seen[0] and seen[3] is seen[4] is seen[5]
+    assert seen[6] is not seen[3]
+    assert pool.size == 1
+
+
+def test_pool_counts_consultations_across_checkouts(kb):
+    pool = EnvironmentPool(min_size=1, max_size=1, max_uses=3)
+    session = RicePestExpertSystem(kb, pool=pool, quiet=True)
+    first = pool.acquire()
+    pool.release(first)
+    envs = []
+    for _ in range(4):
+        with session.consultation():
+            envs.append(session.env)
+    assert envs[0] is first and envs[1] is first
+    assert envs[2] is not first  # retired after its third consultation
+
+
+def test_duplicate_symptoms_match_standalone(kb):
+    # hopper_burn given three times, in both spellings: the last CF counts
+    pairs = [
+        ("hopper-burn", 0.9),
+        ("yellowing_drying", 0.8),
+        ("hopper_burn", 0.9),
+        ("circular-patches", 0.7),
+        ("hopper-burn", 0.6),
+    ]
+    session = RicePestExpertSystem(kb, quiet=True)
+    with session.consultation():
+        session.assert_symptoms(pairs)
+        session.run_inference()
+        got = {p["name"]: p["cf"] for p in session.get_identified_pests()}
+
+    expected = standalone_pests(kb, {clips_symptom_name(s): cf for s, cf in pairs})
+    assert expected
+    assert got.keys() == expected.keys()
+    assert all(got[p] == pytest.approx(expected[p]) for p in got)
+
+
+def test_thread_exiting_with_checked_out_environment_returns_it(kb):
+    pool = EnvironmentPool(min_size=1, max_size=2)
+    session = RicePestExpertSystem(kb, pool=pool, quiet=True)
+    both_checked_out = threading.Barrier(2)
+
+    def hold_and_exit():
+        session.reset_system()
+        both_checked_out.wait(timeout=5)
+
+    threads = [threading.Thread(target=hold_and_exit) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # join() can return just before the thread's locals are cleared
+    deadline = time.monotonic() + 5
+    while pool.idle < 2 and time.monotonic() < deadline:
+        gc.collect()
+        time.sleep(0.01)
+    assert pool.size == 2 and pool.idle == 2
+    session.diagnose({"hopper-burn": 0.9})  # would wait for a lost environment
+
+
+def test_dropped_session_returns_its_environment(kb):
+    pool = EnvironmentPool(min_size=1, max_size=1)
+    session = RicePestExpertSystem(kb, pool=pool, quiet=True)
+    session.reset_system()
+    assert pool.idle == 0
+    del session
+    gc.collect()
+    assert pool.size == 1 and pool.idle == 1
+    pool.release(pool.acquire(timeout=1))
@@ -0,0 +1,156 @@
+import random
+
+import pytest
+
+from helpers import knowledge, rule
+from rice_pest_expert_standalone import ABSENT, load_knowledge_base
+
+
+@pytest.fixture(scope="module")
+def kb():
+    return load_knowledge_base()
+
+
+def random_observations(kb, count, seed=0):
+    names = list(kb.symptoms)
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        chosen = rng.sample(names, rng.randint(1, 8))
+        cases.append({s: rng.choice([0.0, 1.0, round(rng.uniform(0, 1), 3)]) for s in chosen})
+    return cases
+
+
+def test_diagnose_batch_matches_diagnose(kb):
+    np = pytest.importorskip("numpy")
+    cases = random_observations(kb, 500)
+    matrix = np.full((len(cases), len(kb.symptom_names)), ABSENT)
+    for row, observation in enumerate(cases):
+        for name, cf in observation.items():
+            matrix[row, kb.symptom_names.index(name)] = cf
+    matrix[0, :] = np.nan  # NaN is absent as well
+
+    pest_cfs = kb.diagnose_batch(matrix)
+    for row, observation in enumerate(cases):
+        expected = kb.diagnose({} if row == 0 else observation).identified_pests
+        got = {p: cf for p, cf in zip(kb.pest_names, pest_cfs[row]) if cf > 0.0}
+        assert got.keys() == {p for p, cf in expected.items() if cf > 0.0}, observation
+        for pest, cf in got.items():
+            assert cf == pytest.approx(expected[pest]), observation
+
+
+def test_diagnose_batch_zero_cf_is_present(kb):
+    np = pytest.importorskip("numpy")
+    observation = {"egg_mass_on_leaves": 0.0, "larval_feeding_marks": 0.635}
+    row = np.full(len(kb.symptom_names), ABSENT)
+    for name, cf in observation.items():
+        row[kb.symptom_names.index(name)] = cf
+    pest_cfs = dict(zip(kb.pest_names, kb.diagnose_batch([row])[0]))
+    expected = kb.diagnose(observation).identified_pests["Yellow Stem Borer"]
+    assert expected > 0.0
+    assert pest_cfs["Yellow Stem Borer"] == pytest.approx(expected)
+
+
+def test_agenda_matches_single_pass_on_single_level_base(kb):
+    for observation in random_observations(kb, 300, seed=1):
+        single = kb.diagnose(observation)
+        agenda = kb._run_agenda(kb._observed_cfs(observation))
+        assert sorted(agenda.fired_rules) == sorted(single.fired_rules)
+        assert agenda.identified_pests.keys() == single.identified_pests.keys()
+        for pest, cf in single.identified_pests.items():
+            assert agenda.identified_pests[pest] == pytest.approx(cf)
+
+
+def test_agenda_multi_level_base():
+    # Consumers listed before their producers: the strata order the firing
+    kb = knowledge(
+        5,
+        2,
+        [
+            rule("R1", ["severe"], pest="P0", cf=1.0),
+            rule("R2", ["sucking", "s4"], pest="P1", cf=0.7),
+            rule("F2", ["sucking", "s2"], concludes="severe", cf=0.8),
+            rule("F1", ["s0", "s1"], concludes="sucking", cf=0.9),
+            rule("F1b", ["s3"], concludes="sucking", cf=0.5),
+        ],
+    )
+    assert kb.rule_strata == [2, 1, 1, 0, 0]
+    result = kb.diagnose({"s0": 0.8, "s1": 0.6, "s2": 0.5, "s3": 0.4, "s4": 1.0})
+    sucking = 0.63 + 0.2 * (1 - 0.63)  # combine_cf(0.7 * 0.9, 0.4 * 0.5)
+    assert result.identified_pests["P0"] == pytest.approx((sucking + 0.5) / 2 * 0.8)
+    assert result.identified_pests["P1"] == pytest.approx((sucking + 1.0) / 2 * 0.7)
+    assert [r[0] for r in result.fired_rules] == ["R1", "R2", "F2", "F1", "F1b"]
+
+
+def test_agenda_cyclic_base_converges():
+    # x <- s0 (0.5) and x <- y (0.9), y <- x (0.9): x = 0.5 + 0.5 * 0.81 x
+    fillers = [rule(f"Z{i}", ["s1"], pest="P1") for i in range(34)]
+    kb = knowledge(
+        2,
+        2,
+        fillers
+        + [
+            rule("Ra", ["s0"], concludes="x", cf=0.5),
+            rule("Rb", ["x"], concludes="y", cf=0.9),
+            rule("Rc", ["y"], concludes="x", cf=0.9),
+            rule("Rp", ["x"], pest="P0", cf=1.0),
+        ],
+    )
+    assert max(kb.rule_strata) == 1  # one level for the cycle, not ~len(rules)
+    result = kb.diagnose({"s0": 1.0})
+    assert result.identified_pests == {"P0": pytest.approx(0.5 / 0.595, abs=1e-8)}
+
+
+def assert_incremental_matches(session, kb):
+    expected = kb.diagnose(session._observations()).identified_pests
+    assert session.identified_pests.keys() == expected.keys()
+    for pest, cf in expected.items():
+        assert session.identified_pests[pest] == pytest.approx(cf, abs=1e-12)
+
+
+def random_edits(session, kb, edits, seed, cfs=None):
+    # Add, adjust and remove symptoms at random, checking after every edit
+    rng = random.Random(seed)
+    names = list(kb.symptoms)
+    for _ in range(edits):
+        name = rng.choice(names)
+        if session.is_present(name) and rng.random() < 0.4:
+            session.set_symptom(name, present=False)
+        else:
+            cf = rng.choice(cfs) if cfs else rng.choice([0.0, 1.0, round(rng.random(), 3)])
+            session.set_symptom(name, True, cf)
+        assert_incremental_matches(session, kb)
+
+
+def test_incremental_matches_diagnose(kb):
+    from rice_pest_expert_standalone import RicePestExpertSystem
+
+    session = RicePestExpertSystem(kb, incremental=True)
+    random_edits(session, kb, 3000, seed=2)
+    session.reset()
+    assert session.identified_pests == {}
+    random_edits(session, kb, 200, seed=3)
+
+
+def test_incremental_cf_one_contributions():
+    from rice_pest_expert_standalone import RicePestExpertSystem
+
+    # rule_cf 1.0 and symptom CF 1.0 give a contribution of exactly 1.0
+    kb = knowledge(
+        4,
+        1,
+        [
+            rule("R1", ["s0"], pest="P0", cf=1.0),
+            rule("R2", ["s1", "s2"], pest="P0", cf=1.0),
+            rule("R3", ["s3"], pest="P0", cf=0.6),
+        ],
+    )
+    session = RicePestExpertSystem(kb, incremental=True)
+    session.set_symptom("s0", True, 1.0)
+    session.set_symptom("s3", True, 0.5)
+    assert session.identified_pests == {"P0": 1.0}
+    session.set_symptom("s0", True, 0.5)  # adjust away from 1.0
+    assert_incremental_matches(session, kb)
+    session.set_symptom("s0", present=False)
+    assert session.identified_pests == {"P0": pytest.approx(0.3)}
+    random_edits(session, kb, 2000, seed=4, cfs=[0.0, 0.5, 1.0, 1.0])
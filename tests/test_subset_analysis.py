@@ -0,0 +1,124 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import rice_pest_subset_analysis  # noqa: E402
+from helpers import knowledge, rule  # noqa: E402
+from rice_pest_subset_analysis import (  # noqa: E402
+    analyse_masks,
+    compile_bitmask_rules,
+    enumerate_subsets,
+    identify,
+    small_subset_masks,
+)
+
+
+def identified(kb, compiled, mask):
+    """identify() of one mask as a set of pest names"""
+    pest_set = int(identify(np.array([mask], dtype=np.uint64), compiled)[0])
+    return {p for i, p in enumerate(compiled["pests"]) if pest_set >> i & 1}
+
+
+def test_identify_matches_diagnose_with_intermediate_facts():
+    kb = knowledge(
+        5,
+        2,
+        [
+            rule("F1", ["s0", "s1"], concludes="sucking"),
+            rule("F2", ["sucking", "s2"], concludes="severe"),
+            rule("R1", ["severe"], pest="P0"),
+            rule("R2", ["s3", "s4"], pest="P1"),
+        ],
+    )
+    compiled = compile_bitmask_rules(kb)
+    for mask in range(1 << 5):
+        observed = {f"s{i}": 0.9 for i in range(5) if mask >> i & 1}
+        expected = set(kb.diagnose(observed).identified_pests)
+        assert identified(kb, compiled, mask) == expected, observed
+
+
+def test_fact_concluded_but_never_required():
+    kb = knowledge(
+        3,
+        1,
+        [rule("F1", ["s0", "s1"], concludes="unused"), rule("R1", ["s1", "s2"], pest="P0")],
+    )
+    compiled = compile_bitmask_rules(kb)
+    (fact_mask, fact_bit), = compiled["fact_rules"]
+    assert fact_bit == 1 << 3  # above the symptom bits, not a KeyError
+    assert identified(kb, compiled, 0b111) == {"P0"}
+    assert identified(kb, compiled, 0b011) == set()
+
+
+def test_width_check_counts_fact_bits():
+    facts = [rule(f"F{i}", ["s0"], concludes=f"fact{i}") for i in range(5)]
+    kb = knowledge(60, 1, facts + [rule("R1", ["s1"], pest="P0")])
+    with pytest.raises(ValueError, match="64-bit subset mask"):
+        compile_bitmask_rules(kb)
+    compile_bitmask_rules(knowledge(60, 1, facts[:4] + [rule("R1", ["s1"], pest="P0")]))
+
+
+def test_more_than_32_pests():
+    n = 40
+    kb = knowledge(n, n, [rule(f"R{i}", [f"s{i}"], pest=f"P{i}") for i in range(n)])
+    compiled = compile_bitmask_rules(kb)
+    assert identified(kb, compiled, 1 << 35 | 1 << 2) == {"P35", "P2"}
+
+    totals = analyse_masks(small_subset_masks(n, 1), compiled)
+    assert totals["pest_sets"][1 << 39] == 1
+    assert sum(totals["pest_sets"].values()) == n + 1
+
+
+def test_more_than_64_pests_rejected():
+    n = 65
+    kb = knowledge(62, n, [rule(f"R{i}", [f"s{i % 62}"], pest=f"P{i}") for i in range(n)])
+    with pytest.raises(ValueError, match="64-bit pest set"):
+        compile_bitmask_rules(kb)
+
+
+def twelve_symptom_rules():
+    kb = knowledge(
+        12,
+        3,
+        [
+            rule("F1", ["s0", "s1"], concludes="sucking"),
+            rule("R1", ["sucking", "s2"], pest="P0"),
+            rule("R2", ["s3", "s4"], pest="P1"),
+            rule("R3", ["s4", "s5", "s6"], pest="P2"),
+            rule("R4", ["s2", "s7"], pest="P1"),
+            rule("R5", ["s8", "s11"], pest="P2"),
+        ],
+    )
+    return compile_bitmask_rules(kb)
+
+
+def assert_same_totals(got, expected):
+    assert got.keys() == expected.keys()
+    for key, value in expected.items():
+        if key.endswith("_masks"):
+            assert np.array_equal(np.sort(got[key]), np.sort(value)), key
+        elif key == "pest_sets":
+            assert got[key] == value
+        else:
+            assert np.array_equal(got[key], value), key
+
+
+@pytest.mark.parametrize("max_size, workers", [(None, 1), (2, 1), (3, 2)])
+def test_enumerate_subsets_paths_agree(monkeypatch, max_size, workers):
+    # 2^4-subset blocks: the whole space goes by prefix (256 blocks), the
+    # size-limited runs by leading symptom
+    monkeypatch.setattr(rice_pest_subset_analysis, "BLOCK_BITS", 4)
+    compiled = twelve_symptom_rules()
+    if max_size is None:
+        masks = np.arange(1 << 12, dtype=np.uint64)
+    else:
+        masks = small_subset_masks(12, max_size)
+    expected = analyse_masks(masks, compiled, keep_masks=True)
+    got = enumerate_subsets(compiled, max_size, workers=workers, keep_masks=True)
+    assert_same_totals(got, expected)
+
+
+def test_small_subset_masks_lists_each_subset_once():
+    masks = small_subset_masks(10, 3).tolist()
+    assert len(masks) == len(set(masks)) == 1 + 10 + 45 + 120
+    assert all(bin(m).count("1") <= 3 for m in masks)